@@ -0,0 +1,167 @@
+"""
+In-memory calendar of contact birthdays, bucketed by month-day.
+
+The calendar keeps one compact array of contact ids per day of a leap year
+(366 buckets), so "whose birthday falls in the next N days" costs
+O(N + matches) instead of a table query. It is built lazily from the
+database and kept current two ways:
+
+- the contact routes patch it right after committing a create, edit or delete
+- `sync()` compares it with the `contacts_version` counter, which triggers
+  bump on every contact insert, delete and birthday change, and rebuilds it
+  when another process (a second worker, an import) changed the contacts
+
+Feb 29 birthdays are listed on Feb 28 or Mar 1 in non-leap years, per
+FEB29_RULE, the same day `next_birthday` uses.
+"""
+import threading
+from array import array
+from calendar import isleap
+from datetime import date, timedelta
+
+from sqlalchemy import select, text
+
+from app import settings
+from app.db import SessionLocal
+from app.models import Contact, birthday_key
+
+# Month-day key (MMDD) -> bucket index, over the days of a leap year
+MD_INDEX = {
+    birthday_key(date(2000, 1, 1) + timedelta(days=i)): i
+    for i in range(366)
+}
+
+FEB29 = 229
+
+# Current value of the counter bumped by the contacts_version triggers
+VERSION_QUERY = text("SELECT version FROM contacts_version")
+
+
+def month_days_on(day: date) -> list[int]:
+    """Month-day keys whose birthdays are observed on a given date."""
+    md = birthday_key(day)
+    if not isleap(day.year):
+        observed = 301 if settings.FEB29_RULE == "mar1" else 228
+        if md == observed:
+            return [md, FEB29]
+    return [md]
+
+
+class BirthdayCalendar:
+    """
+    Contact ids bucketed by birthday month-day, for fast upcoming-birthday lookups.
+
+    Usage:
+        calendar = birthday_calendar.sync(db)
+        for day, contact_ids in calendar.window(today, 30):
+            ...
+    """
+
+    def __init__(self):
+        self._buckets: list[array] = [array("I") for _ in range(366)]
+        self._size = 0
+        self._version: int | None = None  # None until built, or after invalidation
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """Number of contacts in the calendar."""
+        return self._size
+
+    def sync(self, db) -> "BirthdayCalendar":
+        """
+        Bring the calendar up to date with the database, rebuilding it if needed.
+
+        Args:
+            db: A sync Session; costs one query when nothing changed
+
+        Returns:
+            The calendar itself, for chaining
+        """
+        version = db.execute(VERSION_QUERY).scalar_one()
+        if version == self._version:
+            return self
+        with self._build_lock:
+            if version == self._version:
+                return self  # Rebuilt by another thread meanwhile
+
+            buckets = [array("I") for _ in range(366)]
+            size = 0
+            for contact_id, md in db.execute(select(Contact.id, Contact.birthday_md)).tuples():
+                buckets[MD_INDEX[md]].append(contact_id)
+                size += 1
+            # Rows were read after the version, so they are at least that new;
+            # any later change bumps the version again and is caught next time
+            with self._lock:
+                self._buckets, self._size, self._version = buckets, size, version
+        print(f"   📅 Birthday calendar built: {size} contact(s) (version {version})")
+        return self
+
+    def patch(self, version: int, contact_id: int, old_md: int | None = None, new_md: int | None = None):
+        """
+        Apply one committed contact change without a rebuild.
+
+        Args:
+            version: contacts_version read in the transaction that made the change
+            contact_id: The contact added, edited or deleted
+            old_md: Its previous birthday_md (None when created)
+            new_md: Its new birthday_md (None when deleted)
+        """
+        with self._lock:
+            if self._version is None or version <= self._version:
+                return  # Not built yet, or the change is already included
+            if version != self._version + 1:
+                # Missed a change from elsewhere; rebuild on the next sync
+                self._version = None
+                return
+
+            # Membership checks keep a patch safe to apply twice
+            if old_md is not None:
+                bucket = self._buckets[MD_INDEX[old_md]]
+                if contact_id in bucket:
+                    bucket.remove(contact_id)
+                    self._size -= 1
+            if new_md is not None:
+                bucket = self._buckets[MD_INDEX[new_md]]
+                if contact_id not in bucket:
+                    bucket.append(contact_id)
+                    self._size += 1
+            self._version = version
+
+    def on(self, day: date) -> list[int]:
+        """Ids of contacts whose birthday is observed on a given date."""
+        with self._lock:
+            return [
+                contact_id
+                for md in month_days_on(day)
+                for contact_id in self._buckets[MD_INDEX[md]]
+            ]
+
+    def window(self, start: date, days: int) -> list[tuple[date, list[int]]]:
+        """
+        Birthdays observed on each of `days` days from `start`.
+
+        Returns:
+            (date, contact ids) for every day with at least one birthday, in date order
+        """
+        result = []
+        for offset in range(max(days, 0)):
+            day = start + timedelta(days=offset)
+            contact_ids = self.on(day)
+            if contact_ids:
+                result.append((day, contact_ids))
+        return result
+
+
+# Process-wide calendar shared by the routes and the scheduler
+birthday_calendar = BirthdayCalendar()
+
+
+def load_calendar() -> BirthdayCalendar:
+    """Sync the shared calendar in a session of its own (call from a worker thread)."""
+    db = SessionLocal()
+    try:
+        return birthday_calendar.sync(db)
+    finally:
+        db.close()
@@ -0,0 +1,216 @@
+"""
+Streaming contact import/export in CSV and vCard formats.
+
+Parsers read the upload line by line and yield one parsed row at a time,
+serializers turn batches of contacts into text chunks, so neither side
+ever holds a whole file in memory.
+"""
+import csv
+import io
+import re
+import unicodedata
+from datetime import date, datetime
+from typing import IO, Iterable, Iterator
+
+from app.models import Contact, birthday_key
+
+# Column order used for CSV export (and accepted on import)
+CSV_FIELDS = ("name", "birthday", "note")
+
+# Largest name accepted, matching Contact.name
+MAX_NAME_LENGTH = 100
+
+# (line_number, row, error) where row is None when error is set
+ParsedRow = tuple[int, dict | None, str | None]
+
+
+def detect_format(filename: str, content_type: str) -> str:
+    """Return 'vcard' or 'csv' for an uploaded file."""
+    name = (filename or "").lower()
+    if name.endswith((".vcf", ".vcard")) or "vcard" in (content_type or ""):
+        return "vcard"
+    return "csv"
+
+
+def parse_birthday(value: str) -> date:
+    """
+    Parse a birthday in YYYY-MM-DD, YYYYMMDD or year-less --MM-DD form.
+
+    Year-less birthdays are stored with year 1900 (no age is shown).
+    """
+    value = value.strip().split("T", 1)[0]  # drop a vCard time part
+    for fmt in ("%Y-%m-%d", "%Y%m%d"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+
+    match = re.fullmatch(r"--(\d{2})-?(\d{2})", value)
+    if match:
+        try:
+            return date(1900, int(match.group(1)), int(match.group(2)))
+        except ValueError:
+            pass
+    raise ValueError(f"日期格式无效: {value!r}")
+
+
+def clean_name(name: str) -> str:
+    """
+    Strip and validate a contact name (also used by the contact form).
+
+    Names end up in email subjects, so line breaks and other control
+    characters are rejected.
+    """
+    name = (name or "").strip()
+    if not name:
+        raise ValueError("姓名不能为空")
+    if len(name) > MAX_NAME_LENGTH:
+        raise ValueError(f"姓名超过 {MAX_NAME_LENGTH} 个字符")
+    if any(unicodedata.category(char) == "Cc" for char in name):
+        raise ValueError("姓名不能包含换行或控制字符")
+    return name
+
+
+def build_row(name: str, birthday: str, note: str) -> dict:
+    """Validate raw field values and build an insertable contacts row."""
+    name = clean_name(name)
+    if not (birthday or "").strip():
+        raise ValueError("生日不能为空")
+
+    birthday_date = parse_birthday(birthday)
+    now = datetime.now()
+    return {
+        "name": name,
+        "birthday": birthday_date,
+        "birthday_md": birthday_key(birthday_date),
+        "note": (note or "").strip() or None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def iter_csv(stream: IO[str]) -> Iterator[ParsedRow]:
+    """Parse a CSV with name, birthday[, note] header columns."""
+    reader = csv.DictReader(stream)
+    fields = {name.strip().lower() for name in reader.fieldnames or []}
+    if not {"name", "birthday"} <= fields:
+        yield 1, None, "CSV 表头必须包含 name 和 birthday 列"
+        return
+
+    for record in reader:
+        record = {(key or "").strip().lower(): value for key, value in record.items()}
+        try:
+            row = build_row(record.get("name"), record.get("birthday"), record.get("note"))
+        except ValueError as e:
+            yield reader.line_num, None, str(e)
+        else:
+            yield reader.line_num, row, None
+
+
+def _unescape_vcard(value: str) -> str:
+    """Undo vCard text escaping (\\n, \\, \\; \\\\)."""
+    return re.sub(
+        r"\\(.)",
+        lambda m: "\n" if m.group(1) in "nN" else m.group(1),
+        value,
+    )
+
+
+def _iter_unfolded(stream: IO[str]) -> Iterator[tuple[int, str]]:
+    """Yield (line_number, logical_line), joining folded continuation lines."""
+    current, start = None, 0
+    for number, raw in enumerate(stream, start=1):
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = line, number
+    if current is not None:
+        yield start, current
+
+
+def iter_vcard(stream: IO[str]) -> Iterator[ParsedRow]:
+    """Parse vCard 3.0/4.0 cards, using FN (or N), BDAY and NOTE."""
+    card: dict[str, str] | None = None
+    card_start = 0
+    for number, line in _iter_unfolded(stream):
+        if not line.strip():
+            continue
+        key, _, value = line.partition(":")
+        prop = key.split(";", 1)[0].split(".")[-1].upper()
+
+        if prop == "BEGIN" and value.strip().upper() == "VCARD":
+            card, card_start = {}, number
+        elif prop == "END" and value.strip().upper() == "VCARD" and card is not None:
+            name = card.get("FN")
+            if not name and card.get("N"):
+                # N is family;given;additional;prefix;suffix
+                parts = [p for p in card["N"].split(";") if p]
+                name = "".join(parts[:2])
+            try:
+                row = build_row(name, card.get("BDAY", ""), card.get("NOTE"))
+            except ValueError as e:
+                yield card_start, None, str(e)
+            else:
+                yield card_start, row, None
+            card = None
+        elif card is not None and prop in ("FN", "N", "BDAY", "NOTE"):
+            card.setdefault(prop, value if prop == "N" else _unescape_vcard(value))
+
+
+def iter_rows(binary: IO[bytes], fmt: str) -> Iterator[ParsedRow]:
+    """Decode an uploaded file as UTF-8 (BOM tolerated) and parse it lazily."""
+    stream = io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+    parser = iter_vcard if fmt == "vcard" else iter_csv
+    try:
+        yield from parser(stream)
+    except UnicodeDecodeError:
+        yield 0, None, "文件不是 UTF-8 编码"
+    finally:
+        stream.detach()
+
+
+def csv_chunk(contacts: Iterable[Contact], header: bool = False) -> str:
+    """Serialize a batch of contacts as CSV text."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_FIELDS)
+    for contact in contacts:
+        writer.writerow([
+            contact.name,
+            contact.birthday.isoformat(),
+            contact.note or "",
+        ])
+    return buffer.getvalue()
+
+
+def _escape_vcard(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace(",", "\\,")
+        .replace(";", "\\;")
+    )
+
+
+def vcard_chunk(contacts: Iterable[Contact]) -> str:
+    """Serialize a batch of contacts as vCard 3.0 cards."""
+    lines = []
+    for contact in contacts:
+        lines += [
+            "BEGIN:VCARD",
+            "VERSION:3.0",
+            f"FN:{_escape_vcard(contact.name)}",
+            f"N:{_escape_vcard(contact.name)};;;;",
+        ]
+        if contact.birthday.year > 1900:
+            lines.append(f"BDAY:{contact.birthday.isoformat()}")
+        else:
+            lines.append(f"BDAY:--{contact.birthday.strftime('%m%d')}")
+        if contact.note:
+            lines.append(f"NOTE:{_escape_vcard(contact.note)}")
+        lines.append("END:VCARD")
+    return "".join(line + "\r\n" for line in lines)
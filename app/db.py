@@ -1,21 +1,105 @@
 """
 Database connection and session management.
 """
-from sqlalchemy import create_engine
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
+from app import settings
+from app.metrics import DB_QUERY_LATENCY
 from app.settings import DATABASE_URL
 
 
-# Create engine
+# Sync engine: used by the scheduler thread and schema setup
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False},  # Needed for SQLite
     echo=False,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+)
+
+# Async engine: used by the FastAPI routes so queries never block the event loop
+async_engine = create_async_engine(
+    make_url(DATABASE_URL).set(drivername="sqlite+aiosqlite"),
+    echo=False,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
 )
 
-# Session factory
+# PRAGMAs reported by /health
+REPORTED_PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+
+
+def sqlite_pragmas() -> list[str]:
+    """PRAGMA statements run on every new SQLite connection."""
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}",
+        f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+    ]
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """
+    Tune each new SQLite connection.
+    
+    WAL lets web requests read while the scheduler writes, NORMAL sync is
+    safe under WAL, and busy_timeout makes writers wait for the lock instead
+    of failing immediately with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _observe_query_time(conn, cursor, statement, parameters, context, executemany):
+    DB_QUERY_LATENCY.observe(time.perf_counter() - conn.info["query_start"].pop())
+
+
+@event.listens_for(engine, "handle_error")
+@event.listens_for(async_engine.sync_engine, "handle_error")
+def _observe_failed_query_time(exception_context):
+    """Close the timer of a statement that raised, so pooled connections don't accumulate entries."""
+    conn = exception_context.connection
+    started = conn.info.get("query_start") if conn is not None else None
+    if started:
+        DB_QUERY_LATENCY.observe(time.perf_counter() - started.pop())
+
+
+async def get_pragmas() -> dict:
+    """Read the PRAGMA values active on a pooled connection."""
+    values = {}
+    async with async_engine.connect() as conn:
+        for name in REPORTED_PRAGMAS:
+            values[name] = (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar()
+    return values
+
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
 
 
 class Base(DeclarativeBase):
@@ -23,18 +107,18 @@ class Base(DeclarativeBase):
     pass
 
 
-def get_db():
-    """Dependency that provides a database session."""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """Dependency that provides an async database session."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 def init_db():
-    """Initialize database tables."""
-    from app import models  # Import models to register them
-    Base.metadata.create_all(bind=engine)
-    print("   ✅ Database tables initialized")
-
+    """Create the database, or bring its schema up to date."""
+    database = make_url(DATABASE_URL).database
+    if database and database != ":memory:":
+        Path(database).parent.mkdir(parents=True, exist_ok=True)
+    
+    from app.migrations import migrate
+    migrate(engine)
+    print("   ✅ Database ready")
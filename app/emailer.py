@@ -2,20 +2,410 @@
 Email sending functionality using SMTP.
 """
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
 from email.utils import formataddr
-from datetime import date
+from functools import lru_cache
+from datetime import date, timedelta
 
 from app import settings
-from app.models import Contact
+from app.metrics import SMTP_LATENCY, SMTP_RATE_LIMIT_WAIT, SMTP_THROTTLED
+from app.models import REMINDER_OFFSETS, Contact
+from app.templates_config import email_templates
+
+
+class PooledConnection:
+    """An authenticated SMTP connection plus the bookkeeping the pool needs."""
+
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages_sent = 0
+
+    def close(self):
+        """Close the connection, ignoring errors from a dead socket."""
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+class SMTPPool:
+    """
+    Thread-safe pool of authenticated SMTP connections.
+    
+    Connections are reused across messages so the TLS and AUTH handshakes
+    are paid once per connection instead of once per email. A connection is
+    retired once it exceeds max_age seconds or max_messages sends, checked
+    with NOOP when it has been idle for a while, and replaced transparently
+    if the server has dropped it.
+    """
+
+    # Idle time after which a connection is checked with NOOP before reuse
+    NOOP_AFTER_IDLE = 30
+
+    def __init__(self, max_size: int, max_age: int, max_messages: int):
+        self.max_size = max(1, max_size)
+        self.max_age = max_age
+        self.max_messages = max(1, max_messages)
+        self._idle: list[PooledConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+
+    def _connect(self) -> PooledConnection:
+        """Open and authenticate a new SMTP connection."""
+        with SMTP_LATENCY.time(operation="connect"):
+            if settings.SMTP_MODE == "ssl":
+                server = smtplib.SMTP_SSL(
+                    settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT
+                )
+            else:
+                server = smtplib.SMTP(
+                    settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT
+                )
+                if settings.SMTP_MODE == "starttls":
+                    server.starttls()
+        
+        try:
+            with SMTP_LATENCY.time(operation="login"):
+                server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        return PooledConnection(server)
+
+    def _is_usable(self, conn: PooledConnection) -> bool:
+        """Check limits and, after a long idle period, liveness via NOOP."""
+        now = time.monotonic()
+        if now - conn.created_at >= self.max_age:
+            return False
+        if conn.messages_sent >= self.max_messages:
+            return False
+        if now - conn.last_used >= self.NOOP_AFTER_IDLE:
+            try:
+                code, _ = conn.server.noop()
+            except (smtplib.SMTPException, OSError):
+                return False
+            return code == 250
+        return True
+
+    def _checkout(self) -> PooledConnection:
+        """Take a healthy idle connection, or open a new one."""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._is_usable(conn):
+                return conn
+            conn.close()
+
+    def _checkin(self, conn: PooledConnection):
+        """Return a connection to the pool, or retire it if it hit a limit."""
+        conn.last_used = time.monotonic()
+        if (conn.messages_sent >= self.max_messages
+                or conn.last_used - conn.created_at >= self.max_age):
+            conn.close()
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for one or more sends.
+        
+        The connection goes back to the pool on success and is discarded if
+        the block raises, since its SMTP state is then unknown.
+        """
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            self._checkin(conn)
+        finally:
+            self._slots.release()
+
+    def sendmail(self, from_addr: str, to_addrs: list[str], msg: str | bytes):
+        """Send one message, reconnecting once if the server hung up."""
+        for attempt in range(2):
+            try:
+                with self.connection() as conn:
+                    with SMTP_LATENCY.time(operation="send"):
+                        conn.server.sendmail(from_addr, to_addrs, msg)
+                    conn.messages_sent += 1
+                return
+            except smtplib.SMTPServerDisconnected:
+                if attempt:
+                    raise
+                # Idle siblings are likely dead too (e.g. server restart)
+                self.close()
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+# Shared pool used by the scheduler and the test-email endpoint
+smtp_pool = SMTPPool(
+    max_size=settings.SMTP_POOL_SIZE,
+    max_age=settings.SMTP_MAX_CONNECTION_AGE,
+    max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+)
+
+
+# SMTP replies with which providers ask a client to slow down
+THROTTLE_CODES = frozenset({421, 450, 451})
+
+# Labels that start every EmailLog.error written by a send
+TEMPORARY_ERROR = "[临时]"  # May succeed if retried later
+PERMANENT_ERROR = "[永久]"  # Will fail again until something changes
+DEFERRED_ERROR = "[延后]"  # Not attempted: the send budget is used up
+
+
+class RateLimitExceeded(Exception):
+    """No send budget will be available within SMTP_RATE_MAX_WAIT."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"已达发送配额，约 {retry_after:.0f} 秒后恢复")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Holds up to `capacity` tokens, refilled continuously at `rate` per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Send budget shared by every SMTP send of this process.
+    
+    One token bucket per configured budget (per second, minute and day; 0
+    disables it): a send takes a token from each. A throttling reply
+    (421/450/451) pauses all sends; the pause doubles with each consecutive
+    one and resets after a successful send.
+    """
+
+    def __init__(
+        self,
+        per_second: float = 0,
+        per_minute: int = 0,
+        per_day: int = 0,
+        max_wait: float = 60,
+        backoff: float = 5,
+        backoff_max: float = 300,
+    ):
+        self.max_wait = max_wait
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self._buckets = [
+            TokenBucket(max(1.0, limit), limit / period)
+            for limit, period in ((per_second, 1), (per_minute, 60), (per_day, 86400))
+            if limit > 0
+        ]
+        self._paused_until = 0.0
+        self._throttle_streak = 0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, now: float) -> float:
+        return max([self._paused_until - now] + [bucket.wait_time(now) for bucket in self._buckets])
+
+    def wait_time(self) -> float:
+        """Seconds until the next send may go out."""
+        with self._lock:
+            return max(0.0, self._wait_time(time.monotonic()))
+
+    def acquire(self):
+        """
+        Wait until one more message may be sent, and count it.
+        
+        Raises:
+            RateLimitExceeded: The budget won't allow it within max_wait seconds
+        """
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    for bucket in self._buckets:
+                        bucket.tokens -= 1
+                    break
+            if now + wait - started > self.max_wait:
+                raise RateLimitExceeded(wait)
+            time.sleep(wait)
+        if now > started:
+            SMTP_RATE_LIMIT_WAIT.inc(now - started)
+
+    def throttle(self, code: int) -> float:
+        """Pause all sends after a throttling reply; returns the pause in seconds."""
+        with self._lock:
+            self._throttle_streak += 1
+            pause = min(self.backoff_max, self.backoff * 2 ** (self._throttle_streak - 1))
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        SMTP_THROTTLED.inc(code=code)
+        print(f"   🐢 SMTP {code}: pausing sends for {pause:.0f}s")
+        return pause
+
+    def record_success(self):
+        """A message went through: the next throttling reply starts a new streak."""
+        with self._lock:
+            self._throttle_streak = 0
+
+
+# Shared by the pool's users: the daily job, the outbox drain and test emails
+rate_limiter = RateLimiter(
+    per_second=settings.SMTP_RATE_PER_SECOND,
+    per_minute=settings.SMTP_RATE_PER_MINUTE,
+    per_day=settings.SMTP_RATE_PER_DAY,
+    max_wait=settings.SMTP_RATE_MAX_WAIT,
+    backoff=settings.SMTP_THROTTLE_BACKOFF,
+    backoff_max=settings.SMTP_THROTTLE_BACKOFF_MAX,
+)
+
+
+# Reminder type -> (label, emoji) used in subjects and bodies
+REMINDER_LABELS = {
+    "week": "一周后",
+    "day": "明天",
+    "today": "今天",
+}
+
+REMINDER_EMOJI = {
+    "week": "📅",
+    "day": "⏰",
+    "today": "🎂",
+}
+
+
+# Templates are compiled once at import time: (html, plain text) per email
+REMINDER_TEMPLATES = (
+    email_templates.get_template("reminder.html"),
+    email_templates.get_template("reminder.txt"),
+)
+DIGEST_TEMPLATES = (
+    email_templates.get_template("digest.html"),
+    email_templates.get_template("digest.txt"),
+)
+TEST_TEMPLATES = (
+    email_templates.get_template("test.html"),
+    email_templates.get_template("test.txt"),
+)
+
+
+def _render(templates, **context) -> tuple[str, str]:
+    """Render an (html, text) template pair with the same context."""
+    html_template, text_template = templates
+    return html_template.render(**context), text_template.render(**context)
+
+
+@lru_cache(maxsize=8)
+def _from_header(from_email: str) -> str:
+    """Formatted From header; invariant for a given sender, so computed once."""
+    return formataddr(("Birthday Notify Bird", from_email))
+
+
+def build_message(
+    to_email: str,
+    subject: str,
+    html_body: str,
+    text_body: str = "",
+) -> bytes:
+    """
+    Build a multipart/alternative message and serialize it once.
+    
+    Uses the SMTP policy (CRLF line endings, RFC-compliant header folding),
+    so the bytes can go to sendmail() as-is without further conversion.
+    
+    Returns:
+        The wire-format message
+    """
+    msg = EmailMessage(policy=SMTP_POLICY)
+    msg["Subject"] = subject
+    msg["From"] = _from_header(settings.FROM_EMAIL)
+    msg["To"] = to_email
+    # base64 keeps CJK text compact and does not rely on the server's 8BITMIME
+    if text_body:
+        msg.set_content(text_body, cte="base64")
+        msg.add_alternative(html_body, subtype="html", cte="base64")
+    else:
+        msg.set_content(html_body, subtype="html", cte="base64")
+    return msg.as_bytes()
+
+
+def _subject_name(contact: Contact) -> str:
+    """Contact name on one line, as a header requires (older rows may hold line breaks)."""
+    return " ".join(contact.name.split())
+
+
+def _age_on(contact: Contact, target_date: date) -> int | None:
+    """Age reached on target_date, if the birth year is meaningful."""
+    if contact.birthday.year > 1900:
+        return target_date.year - contact.birthday.year
+    return None
+
+
+def reminder_wording(
+    reminder_type: str,
+    target_date: date,
+    today: date | None = None,
+) -> tuple[str, str, bool]:
+    """
+    Label and emoji describing when a birthday is.
+    
+    A reminder sent after its due day (caught up after missed runs) is
+    worded by the actual distance from `today`, not by its type: a missed
+    week reminder for a birthday two days away says "2 天后".
+    
+    Returns:
+        Tuple of (label, emoji, late)
+    """
+    due = target_date - timedelta(days=REMINDER_OFFSETS.get(reminder_type, 0))
+    if today is None or due >= today:
+        label = REMINDER_LABELS.get(reminder_type, reminder_type)
+        return label, REMINDER_EMOJI.get(reminder_type, "🔔"), False
+    
+    days = (target_date - today).days
+    if days == 0:
+        return REMINDER_LABELS["today"], REMINDER_EMOJI["today"], True
+    if days == 1:
+        return REMINDER_LABELS["day"], REMINDER_EMOJI["day"], True
+    if days > 1:
+        return f"{days} 天后", REMINDER_EMOJI["week"], True
+    return f"{-days} 天前", REMINDER_EMOJI["today"], True
 
 
 def create_reminder_email(
     contact: Contact,
     reminder_type: str,
     target_date: date,
-) -> tuple[str, str]:
+    today: date | None = None,
+) -> tuple[str, str, str]:
     """
     Create email subject and body for a birthday reminder.
     
@@ -23,81 +413,92 @@ def create_reminder_email(
         contact: The contact whose birthday is coming up
         reminder_type: 'week', 'day', or 'today'
         target_date: The actual birthday date this year
+        today: Date of the send; a reminder due before it is caught up after
+            a missed run, marked in the subject and worded by `reminder_wording`
     
     Returns:
-        Tuple of (subject, html_body)
+        Tuple of (subject, html_body, text_body)
     """
-    type_labels = {
-        "week": "一周后",
-        "day": "明天",
-        "today": "今天",
-    }
+    label, emoji, late = reminder_wording(reminder_type, target_date, today)
     
-    type_emoji = {
-        "week": "📅",
-        "day": "⏰",
-        "today": "🎂",
-    }
+    subject = f"{emoji} {_subject_name(contact)} 的生日{label}！"
+    if late:
+        subject = f"【补发】{subject}"
+    html_body, text_body = _render(
+        REMINDER_TEMPLATES,
+        contact=contact,
+        label=label,
+        emoji=emoji,
+        target_date=target_date,
+        age=_age_on(contact, target_date),
+    )
     
-    label = type_labels.get(reminder_type, reminder_type)
-    emoji = type_emoji.get(reminder_type, "🔔")
+    return subject, html_body, text_body
+
+
+def create_digest_email(
+    items: list[tuple[Contact, str, date]],
+    today: date,
+) -> tuple[str, str, str]:
+    """
+    Create a single digest email covering every reminder of a run.
     
-    # Calculate age if birth year is reasonable
-    age_text = ""
-    if contact.birthday.year > 1900:
-        age = target_date.year - contact.birthday.year
-        age_text = f"（{age}岁）"
-    
-    subject = f"{emoji} {contact.name} 的生日{label}！"
-    
-    html_body = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-    </head>
-    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 500px; margin: 0 auto; padding: 20px; background: #f5f5f5;">
-        <div style="background: white; border-radius: 12px; padding: 30px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-            <div style="text-align: center; font-size: 48px; margin-bottom: 20px;">{emoji}</div>
-            
-            <h1 style="text-align: center; color: #333; margin: 0 0 10px 0; font-size: 24px;">
-                {contact.name} 的生日{label}！
-            </h1>
-            
-            <p style="text-align: center; color: #666; margin: 0 0 30px 0;">
-                {target_date.strftime('%Y年%m月%d日')} {age_text}
-            </p>
-            
-            <div style="background: #f8f9fa; border-radius: 8px; padding: 20px; margin-bottom: 20px;">
-                <table style="width: 100%; border-collapse: collapse;">
-                    <tr>
-                        <td style="color: #888; padding: 5px 0;">姓名</td>
-                        <td style="text-align: right; font-weight: 500;">{contact.name}</td>
-                    </tr>
-                    <tr>
-                        <td style="color: #888; padding: 5px 0;">生日</td>
-                        <td style="text-align: right;">{contact.birthday.strftime('%m月%d日')}</td>
-                    </tr>
-                    {"<tr><td style='color: #888; padding: 5px 0;'>备注</td><td style='text-align: right;'>" + contact.note + "</td></tr>" if contact.note else ""}
-                </table>
-            </div>
-            
-            <p style="text-align: center; color: #888; font-size: 14px; margin: 0;">
-                记得送上你的祝福哦 💝
-            </p>
-        </div>
-        
-        <p style="text-align: center; color: #aaa; font-size: 12px; margin-top: 20px;">
-            Birthday Notify Bird 🐦
-        </p>
-    </body>
-    </html>
+    Args:
+        items: (contact, reminder_type, target_date) tuples
+        today: The date of the run
+    
+    Returns:
+        Tuple of (subject, html_body, text_body)
     """
+    # One section per label, nearest birthdays first
+    grouped: dict[tuple[str, str], list[dict]] = {}
+    for contact, reminder_type, target_date in sorted(items, key=lambda item: item[2]):
+        label, emoji, _ = reminder_wording(reminder_type, target_date, today)
+        grouped.setdefault((label, emoji), []).append({
+            "contact": contact,
+            "target_date": target_date,
+            "age": _age_on(contact, target_date),
+        })
+    
+    sections = [
+        {"emoji": emoji, "label": label, "entries": entries}
+        for (label, emoji), entries in grouped.items()
+    ]
     
-    return subject, html_body
+    names = "、".join(_subject_name(contact) for contact, _, _ in items[:3])
+    if len(items) > 3:
+        names += f" 等 {len(items)} 人"
+    subject = f"🐦 生日提醒汇总：{names}"
+    html_body, text_body = _render(DIGEST_TEMPLATES, today=today, sections=sections)
+    
+    return subject, html_body, text_body
+
+
+def create_test_email() -> tuple[str, str, str]:
+    """
+    Create the email sent by /api/test-email.
+    
+    Returns:
+        Tuple of (subject, html_body, text_body)
+    """
+    subject = "🧪 Birthday Notify Bird - 测试邮件"
+    html_body, text_body = _render(
+        TEST_TEMPLATES,
+        smtp_host=settings.SMTP_HOST,
+        smtp_port=settings.SMTP_PORT,
+        smtp_mode=settings.SMTP_MODE,
+        from_email=settings.FROM_EMAIL,
+        to_email=settings.TO_EMAIL,
+    )
+    return subject, html_body, text_body
 
 
-def send_email(to_email: str, subject: str, html_body: str) -> tuple[bool, str]:
+def send_email(
+    to_email: str,
+    subject: str,
+    html_body: str,
+    text_body: str = "",
+) -> tuple[bool, str]:
     """
     Send an email via SMTP.
     
@@ -105,6 +506,7 @@ def send_email(to_email: str, subject: str, html_body: str) -> tuple[bool, str]:
         to_email: Recipient email address
         subject: Email subject
         html_body: HTML email body
+        text_body: Plain-text alternative (optional)
     
     Returns:
         Tuple of (success, error_message)
@@ -112,58 +514,152 @@ def send_email(to_email: str, subject: str, html_body: str) -> tuple[bool, str]:
     # Validate settings
     valid, msg = settings.validate_email_settings()
     if not valid:
-        return False, msg
+        return False, f"{PERMANENT_ERROR} {msg}"
     
     try:
-        # Create message
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = formataddr(("Birthday Notify Bird", settings.FROM_EMAIL))
-        msg["To"] = to_email
+        message = build_message(to_email, subject, html_body, text_body)
         
-        # Add HTML body
-        html_part = MIMEText(html_body, "html", "utf-8")
-        msg.attach(html_part)
-        
-        # Connect and send
-        if settings.SMTP_MODE == "ssl":
-            server = smtplib.SMTP_SSL(settings.SMTP_HOST, settings.SMTP_PORT)
-        else:
-            server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT)
-            if settings.SMTP_MODE == "starttls":
-                server.starttls()
-        
-        server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-        server.sendmail(settings.FROM_EMAIL, [to_email], msg.as_string())
-        server.quit()
+        # Send over a pooled, already authenticated connection
+        rate_limiter.acquire()
+        smtp_pool.sendmail(settings.FROM_EMAIL, [to_email], message)
+        rate_limiter.record_success()
         
         return True, ""
     
-    except smtplib.SMTPAuthenticationError as e:
-        return False, f"SMTP 认证失败: {str(e)}"
-    except smtplib.SMTPException as e:
-        return False, f"SMTP 错误: {str(e)}"
     except Exception as e:
-        return False, f"发送失败: {str(e)}"
+        return False, note_failure(e)
 
 
-def send_birthday_reminder(
-    contact: Contact,
-    reminder_type: str,
-    target_date: date,
+def reply_codes(e: Exception) -> list[int]:
+    """SMTP reply codes carried by a send exception."""
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return [code for code, _ in e.recipients.values()]
+    if isinstance(e, smtplib.SMTPResponseException):
+        return [e.smtp_code]
+    return []
+
+
+def is_temporary(e: Exception) -> bool:
+    """True for 4xx replies and dropped or failed connections."""
+    codes = reply_codes(e)
+    if codes:
+        return all(400 <= code < 500 for code in codes)
+    if isinstance(e, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(e, smtplib.SMTPException):
+        return False
+    return isinstance(e, OSError)  # Timeouts, refused connections
+
+
+def describe_error(e: Exception) -> str:
+    """Turn a send exception into the message stored in EmailLog.error."""
+    if isinstance(e, RateLimitExceeded):
+        return f"{DEFERRED_ERROR} {str(e)}"
+    label = TEMPORARY_ERROR if is_temporary(e) else PERMANENT_ERROR
+    if isinstance(e, smtplib.SMTPAuthenticationError):
+        return f"{label} SMTP 认证失败: {str(e)}"
+    if isinstance(e, smtplib.SMTPException):
+        return f"{label} SMTP 错误: {str(e)}"
+    return f"{label} 发送失败: {str(e)}"
+
+
+def note_failure(e: Exception) -> str:
+    """Back off if the server is throttling us, and describe the error."""
+    throttled = [code for code in reply_codes(e) if code in THROTTLE_CODES]
+    if throttled:
+        rate_limiter.throttle(throttled[0])
+    return describe_error(e)
+
+
+# Errors that reject one message but leave the SMTP session usable
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+
+def send_batch(
+    to_email: str,
+    emails: list[tuple[str, str, str]],
+) -> list[tuple[bool, str]]:
+    """
+    Send several emails to one recipient over a single SMTP session.
+    
+    A message that can't be built or is rejected fails alone without ending
+    the session; a dropped connection is reopened once per message.
+    Sessions still honour the pool's per-connection message limit, and
+    every message waits for the shared rate limiter; once its budget runs
+    out the rest are deferred.
+    
+    Args:
+        to_email: Recipient email address
+        emails: (subject, html_body, text_body) tuples
+    
+    Returns:
+        (success, error_message) for each email, in input order
+    """
+    valid, msg = settings.validate_email_settings()
+    if not valid:
+        return [(False, f"{PERMANENT_ERROR} {msg}")] * len(emails)
+    
+    results: list[tuple[bool, str]] = []
+    reconnected = False
+    while len(results) < len(emails):
+        try:
+            with smtp_pool.connection() as conn:
+                for subject, html_body, text_body in emails[len(results):]:
+                    if conn.messages_sent >= smtp_pool.max_messages:
+                        break  # Retire this connection and continue on a fresh one
+                    try:
+                        message = build_message(to_email, subject, html_body, text_body)
+                    except Exception as e:
+                        # Only this message is malformed; the session is untouched
+                        results.append((False, describe_error(e)))
+                        continue
+                    rate_limiter.acquire()
+                    try:
+                        with SMTP_LATENCY.time(operation="send"):
+                            conn.server.sendmail(settings.FROM_EMAIL, [to_email], message)
+                    except MESSAGE_ERRORS as e:
+                        results.append((False, note_failure(e)))
+                        continue
+                    rate_limiter.record_success()
+                    conn.messages_sent += 1
+                    results.append((True, ""))
+                    reconnected = False
+        except smtplib.SMTPServerDisconnected as e:
+            if reconnected:
+                results.append((False, describe_error(e)))
+            reconnected = not reconnected
+            smtp_pool.close()
+        except Exception as e:
+            # Connecting or logging in failed, or the send budget ran out:
+            # the rest would fail the same way
+            error = note_failure(e)
+            results.extend([(False, error)] * (len(emails) - len(results)))
+    return results
+
+
+def send_digest(
+    items: list[tuple[Contact, str, date]],
+    today: date,
+    to_email: str | None = None,
 ) -> tuple[bool, str, str]:
     """
-    Send a birthday reminder email.
+    Send all reminders of a run as one digest email.
+    
+    Sent in a single attempt, so either every reminder is delivered or none
+    is; the outbox retries the digest as a unit after temporary failures.
     
     Args:
-        contact: The contact
-        reminder_type: 'week', 'day', or 'today'
-        target_date: The birthday date this year
+        items: (contact, reminder_type, target_date) tuples
+        today: The date of the run
+        to_email: Recipient (defaults to TO_EMAIL)
     
     Returns:
         Tuple of (success, subject, error_message)
     """
-    subject, html_body = create_reminder_email(contact, reminder_type, target_date)
-    success, error = send_email(settings.TO_EMAIL, subject, html_body)
+    subject, html_body, text_body = create_digest_email(items, today)
+    success, error = send_email(to_email or settings.TO_EMAIL, subject, html_body, text_body)
     return success, subject, error
-
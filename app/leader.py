@@ -0,0 +1,110 @@
+"""
+Database-backed leader lease for multi-worker deployments.
+
+Every worker process (e.g. `uvicorn --workers 4`) starts a scheduler, but
+scheduled jobs only run in the process holding the lease. The holder renews
+it every LEADER_RENEW_SECONDS; if it dies, the lease expires after
+LEADER_LEASE_SECONDS and the next worker to renew takes over.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import settings
+from app.db import SessionLocal
+from app.models import SchedulerLease
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class LeaderLease:
+    """
+    One named lease row, acquired and renewed with a single atomic upsert.
+
+    Usage:
+        lease = LeaderLease("scheduler", ttl=30)
+        if lease.try_acquire():
+            ...  # this process may run the jobs
+    """
+
+    def __init__(self, name: str, ttl: int, holder: str | None = None):
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._valid_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_leader(self) -> bool:
+        """True while the last successful renewal has not run out."""
+        with self._lock:
+            return time.monotonic() < self._valid_until
+
+    def try_acquire(self) -> bool:
+        """
+        Take the lease if it is free or expired, or extend it if already held.
+
+        Returns:
+            True if this process holds the lease afterwards
+        """
+        started = time.monotonic()
+        now = _utcnow()
+        db = SessionLocal()
+        try:
+            # Insert, or overwrite only a row we hold or one that has expired
+            statement = sqlite_insert(SchedulerLease).values(
+                name=self.name,
+                holder=self.holder,
+                expires_at=now + timedelta(seconds=self.ttl),
+            )
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[SchedulerLease.name],
+                set_={
+                    "holder": statement.excluded.holder,
+                    "expires_at": statement.excluded.expires_at,
+                },
+                where=(SchedulerLease.holder == self.holder) | (SchedulerLease.expires_at < now),
+            ))
+            db.commit()
+            holder = db.execute(
+                select(SchedulerLease.holder).where(SchedulerLease.name == self.name)
+            ).scalar()
+        except Exception as e:
+            print(f"⚠️  Leader lease renewal failed: {e}")
+            db.rollback()
+            return self.is_leader
+        finally:
+            db.close()
+
+        with self._lock:
+            # Measured from before the write, so we never outlive the row
+            self._valid_until = started + self.ttl if holder == self.holder else 0.0
+        return holder == self.holder
+
+    def release(self):
+        """Give the lease up (on shutdown) so another worker can take over at once."""
+        with self._lock:
+            self._valid_until = 0.0
+        db = SessionLocal()
+        try:
+            db.execute(delete(SchedulerLease).where(
+                SchedulerLease.name == self.name,
+                SchedulerLease.holder == self.holder,
+            ))
+            db.commit()
+        except Exception as e:
+            print(f"⚠️  Leader lease release failed: {e}")
+        finally:
+            db.close()
+
+
+# Lease shared by all scheduled jobs of this process
+scheduler_lease = LeaderLease("scheduler", ttl=settings.LEADER_LEASE_SECONDS)
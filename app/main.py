@@ -1,11 +1,17 @@
 """
 Birthday Notify Bird - Main FastAPI Application
 """
+import asyncio
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from datetime import date
+from fastapi import Depends, FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import settings
 
@@ -17,6 +23,24 @@ STATIC_DIR.mkdir(exist_ok=True)
 
 # Import shared templates (configured with url_for_path)
 from app.templates_config import templates
+from app.page_cache import CachedPage, data_version
+from app.metrics import HTTP_LATENCY, REGISTRY
+from app.birthday_calendar import load_calendar
+from app.db import get_db
+from app.models import Contact
+
+# Upcoming birthdays shown on the home page
+UPCOMING_DAYS = 30
+UPCOMING_LIMIT = 20
+
+
+def _start_scheduler():
+    """Import and start the scheduler (runs in a worker thread during startup)."""
+    try:
+        from app.scheduler import start_scheduler
+        start_scheduler()
+    except Exception as e:
+        print(f"   ❌ Scheduler failed to start: {e}")
 
 
 @asynccontextmanager
@@ -31,9 +55,9 @@ async def lifespan(app: FastAPI):
     from app.db import init_db
     init_db()
     
-    # Start scheduler
-    from app.scheduler import start_scheduler
-    start_scheduler()
+    # Start scheduler off the startup path: importing APScheduler, pytz and
+    # the mailer isn't needed to serve the first request
+    scheduler_started = asyncio.get_running_loop().run_in_executor(None, _start_scheduler)
     
     # Validate email settings
     valid, msg = settings.validate_email_settings()
@@ -45,6 +69,7 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    await scheduler_started
     from app.scheduler import stop_scheduler
     stop_scheduler()
     print("🐦 Birthday Notify Bird shutting down...")
@@ -58,6 +83,26 @@ app = FastAPI(
     root_path=settings.ROOT_PATH,  # 支持子路径部署
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe request latency, labelled by route template rather than raw URL."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            # Unmatched paths share one label so scanners can't explode cardinality
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+
+
 # Mount static files
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
@@ -68,88 +113,81 @@ app.include_router(logs.router)
 
 
 @app.get("/", response_class=HTMLResponse)
-async def index(request: Request):
-    """Home page."""
-    return templates.TemplateResponse(
+async def index(request: Request, db: AsyncSession = Depends(get_db)):
+    """Home page, with the birthdays of the next UPCOMING_DAYS days."""
+    today = date.today()
+    page_cache = CachedPage(request, await data_version(db), vary=today.isoformat())
+    if (cached := page_cache.lookup()) is not None:
+        return cached
+    
+    # The calendar lists the ids by date; only those rows are loaded
+    calendar = await run_in_threadpool(load_calendar)
+    upcoming_ids = [
+        (day, contact_id)
+        for day, contact_ids in calendar.window(today, UPCOMING_DAYS)
+        for contact_id in sorted(contact_ids)
+    ][:UPCOMING_LIMIT]
+    contacts = {
+        contact.id: contact
+        for contact in (await db.execute(
+            select(Contact).where(Contact.id.in_([contact_id for _, contact_id in upcoming_ids]))
+        )).scalars()
+    }
+    upcoming = [
+        {"contact": contacts[contact_id], "date": day, "days_until": (day - today).days}
+        for day, contact_id in upcoming_ids
+        if contact_id in contacts
+    ]
+    
+    return page_cache.store(templates.TemplateResponse(
         "index.html",
         {
             "request": request,
             "title": "Birthday Notify Bird",
             "daily_run_at": settings.DAILY_RUN_AT,
             "timezone": settings.TIMEZONE,
+            "upcoming": upcoming,
+            "upcoming_days": UPCOMING_DAYS,
         }
-    )
+    ))
 
 
 @app.get("/health")
 async def health():
     """Health check endpoint."""
+    from app.db import get_pragmas
+    from app.leader import scheduler_lease
+    
     valid, msg = settings.validate_email_settings()
     return {
         "status": "ok",
         "email_configured": valid,
         "timezone": settings.TIMEZONE,
         "daily_run_at": settings.DAILY_RUN_AT,
+        "scheduler_leader": scheduler_lease.is_leader,
+        "sqlite": await get_pragmas(),
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics in the text exposition format."""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/api/test-email")
 async def test_email():
     """Send a test email to verify email configuration."""
-    from app.emailer import send_email
-    from datetime import date
+    from app.emailer import create_test_email, send_email
     
-    # Create a test email
-    test_subject = "🧪 Birthday Notify Bird - 测试邮件"
-    test_html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-    </head>
-    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 500px; margin: 0 auto; padding: 20px; background: #f5f5f5;">
-        <div style="background: white; border-radius: 12px; padding: 30px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
-            <div style="text-align: center; font-size: 48px; margin-bottom: 20px;">🧪</div>
-            
-            <h1 style="text-align: center; color: #333; margin: 0 0 10px 0; font-size: 24px;">
-                测试邮件发送成功！
-            </h1>
-            
-            <p style="text-align: center; color: #666; margin: 0 0 30px 0;">
-                如果你收到这封邮件，说明邮件配置正确 ✅
-            </p>
-            
-            <div style="background: #f8f9fa; border-radius: 8px; padding: 20px; margin-bottom: 20px;">
-                <p style="color: #333; margin: 0;">
-                    这是一封测试邮件，用于验证 Birthday Notify Bird 的邮件发送功能是否正常工作。
-                </p>
-            </div>
-            
-            <p style="text-align: center; color: #888; font-size: 14px; margin: 0;">
-                邮件配置信息：
-            </p>
-            <ul style="color: #666; font-size: 14px;">
-                <li>SMTP 服务器: {smtp_host}:{smtp_port}</li>
-                <li>SMTP 模式: {smtp_mode}</li>
-                <li>发送邮箱: {from_email}</li>
-                <li>接收邮箱: {to_email}</li>
-            </ul>
-        </div>
-        
-        <p style="text-align: center; color: #aaa; font-size: 12px; margin-top: 20px;">
-            Birthday Notify Bird 🐦
-        </p>
-    </body>
-    </html>
-    """.format(
-        smtp_host=settings.SMTP_HOST,
-        smtp_port=settings.SMTP_PORT,
-        smtp_mode=settings.SMTP_MODE,
-        from_email=settings.FROM_EMAIL,
-        to_email=settings.TO_EMAIL
-    )
+    test_subject, test_html, test_text = create_test_email()
     
-    success, error_msg = send_email(settings.TO_EMAIL, test_subject, test_html)
+    # SMTP I/O is blocking; run it in the threadpool so other requests keep flowing
+    success, error_msg = await run_in_threadpool(
+        send_email, settings.TO_EMAIL, test_subject, test_html, test_text
+    )
     
     if success:
         return {
@@ -0,0 +1,183 @@
+"""
+Minimal in-process metrics registry with Prometheus text exposition.
+
+Counters and histograms are thread-safe and labelled; GET /metrics
+renders every registered metric in the Prometheus text format (0.0.4),
+so any scraper can collect them without an extra client library.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from fast DB queries to slow SMTP handshakes
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value per the exposition format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing counter."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.labelnames:
+            values = {(): 0}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values (usually seconds)."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [bucket counts..., sum, count]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of a with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+        lines = []
+        for key, state in sorted(values.items()):
+            for bound, count in zip(self.buckets, state):
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-2]!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together by /metrics."""
+
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Daily job
+JOB_DURATION = REGISTRY.register(Histogram(
+    "birthday_job_duration_seconds", "Duration of birthday check runs.",
+))
+JOB_CONTACTS_SCANNED = REGISTRY.register(Counter(
+    "birthday_job_contacts_scanned_total", "Contacts examined by birthday check runs.",
+))
+REMINDERS = REGISTRY.register(Counter(
+    "birthday_reminders_total",
+    "Reminders by type and result (matched, sent, skipped, failed, retried).",
+    ("reminder_type", "result"),
+))
+
+# SMTP
+SMTP_LATENCY = REGISTRY.register(Histogram(
+    "birthday_smtp_seconds",
+    "SMTP operation latency by operation (connect, login, send).",
+    ("operation",),
+))
+SMTP_THROTTLED = REGISTRY.register(Counter(
+    "birthday_smtp_throttled_total",
+    "SMTP replies asking the client to slow down, by reply code.",
+    ("code",),
+))
+SMTP_RATE_LIMIT_WAIT = REGISTRY.register(Counter(
+    "birthday_smtp_rate_limit_wait_seconds_total",
+    "Time sends spent waiting for the rate limiter.",
+))
+
+# Database
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "birthday_db_query_seconds", "Database statement execution time.",
+))
+
+# HTTP
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "birthday_http_request_seconds",
+    "HTTP request latency by method, route and status code.",
+    ("method", "route", "status"),
+))
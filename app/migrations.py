@@ -0,0 +1,398 @@
+"""
+Versioned schema migrations.
+
+The `schema_version` table records every migration applied to the
+database. A new database gets the current schema straight from the models
+and is stamped with the latest version; an existing one has the migrations
+it lacks applied in order, each in its own transaction. At the latest
+version, startup costs a single query.
+
+To change the schema, update the models and append a migration that brings
+existing databases to the same state. Never edit or reorder a released one.
+"""
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Connection, Engine, inspect, text
+from sqlalchemy.exc import OperationalError
+
+from app import models  # Import models to register them
+from app.db import Base
+
+
+# Baseline (version 1) tables, frozen as they were when versioning began.
+# Later schema changes belong in new migrations, never here.
+BASELINE_TABLES_DDL = [
+    "CREATE TABLE IF NOT EXISTS contacts ("
+    "id INTEGER NOT NULL, "
+    "name VARCHAR(100) NOT NULL, "
+    "birthday DATE NOT NULL, "
+    "birthday_md INTEGER NOT NULL, "
+    "note TEXT, "
+    "created_at DATETIME NOT NULL, "
+    "updated_at DATETIME NOT NULL, "
+    "PRIMARY KEY (id))",
+    "CREATE TABLE IF NOT EXISTS recipients ("
+    "id INTEGER NOT NULL, "
+    "email VARCHAR(255) NOT NULL, "
+    "created_at DATETIME NOT NULL, "
+    "PRIMARY KEY (id), "
+    "UNIQUE (email))",
+    "CREATE TABLE IF NOT EXISTS job_state ("
+    "name VARCHAR(50) NOT NULL, "
+    "last_run_date DATE, "
+    "updated_at DATETIME NOT NULL, "
+    "PRIMARY KEY (name))",
+    "CREATE TABLE IF NOT EXISTS scheduler_lease ("
+    "name VARCHAR(50) NOT NULL, "
+    "holder VARCHAR(255) NOT NULL, "
+    "expires_at DATETIME NOT NULL, "
+    "PRIMARY KEY (name))",
+    "CREATE TABLE IF NOT EXISTS subscriptions ("
+    "contact_id INTEGER NOT NULL, "
+    "recipient_id INTEGER NOT NULL, "
+    "PRIMARY KEY (contact_id, recipient_id), "
+    "FOREIGN KEY(contact_id) REFERENCES contacts (id) ON DELETE CASCADE, "
+    "FOREIGN KEY(recipient_id) REFERENCES recipients (id) ON DELETE CASCADE)",
+    "CREATE TABLE IF NOT EXISTS email_log ("
+    "id INTEGER NOT NULL, "
+    "contact_id INTEGER NOT NULL, "
+    "reminder_type VARCHAR(20) NOT NULL, "
+    "send_date DATE NOT NULL, "
+    "email_to VARCHAR(255) NOT NULL, "
+    "subject VARCHAR(500) NOT NULL, "
+    "status VARCHAR(20) NOT NULL, "
+    "error TEXT, "
+    "created_at DATETIME NOT NULL, "
+    "PRIMARY KEY (id), "
+    "FOREIGN KEY(contact_id) REFERENCES contacts (id))",
+    "CREATE TABLE IF NOT EXISTS outbox ("
+    "id INTEGER NOT NULL, "
+    "contact_id INTEGER NOT NULL, "
+    "reminder_type VARCHAR(20) NOT NULL, "
+    "send_date DATE NOT NULL, "
+    "target_date DATE NOT NULL, "
+    "email_to VARCHAR(255) NOT NULL, "
+    "status VARCHAR(20) NOT NULL, "
+    "attempts INTEGER NOT NULL, "
+    "next_attempt_at DATETIME NOT NULL, "
+    "claimed_until DATETIME, "
+    "last_error TEXT, "
+    "created_at DATETIME NOT NULL, "
+    "PRIMARY KEY (id), "
+    "FOREIGN KEY(contact_id) REFERENCES contacts (id))",
+]
+
+# Baseline indexes of tables the steps below don't otherwise touch
+BASELINE_INDEXES_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_subscriptions_recipient_id ON subscriptions (recipient_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_outbox_contact_type_date_to "
+    "ON outbox (contact_id, reminder_type, send_date, email_to)",
+    "CREATE INDEX IF NOT EXISTS ix_outbox_status_next_attempt ON outbox (status, next_attempt_at)",
+]
+
+
+def _upgrade_legacy_schema(conn: Connection):
+    """Bring a database created before schema versioning to the baseline."""
+    # Tables added by releases the database never ran
+    for statement in BASELINE_TABLES_DDL:
+        conn.execute(text(statement))
+
+    columns = {c["name"] for c in inspect(conn).get_columns("contacts")}
+    if "birthday_md" not in columns:
+        conn.execute(text(
+            "ALTER TABLE contacts ADD COLUMN birthday_md INTEGER NOT NULL DEFAULT 0"
+        ))
+    # Backfill month-day keys for rows written before the column existed
+    conn.execute(text(
+        "UPDATE contacts SET birthday_md = "
+        "CAST(strftime('%m', birthday) AS INTEGER) * 100 + "
+        "CAST(strftime('%d', birthday) AS INTEGER) "
+        "WHERE birthday_md = 0"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_contacts_birthday_md ON contacts (birthday_md)"
+    ))
+    # Drop duplicate reminders (keep the earliest) before enforcing uniqueness
+    conn.execute(text(
+        "DELETE FROM email_log WHERE id NOT IN ("
+        "SELECT MIN(id) FROM email_log "
+        "GROUP BY contact_id, reminder_type, send_date, email_to)"
+    ))
+    # Idempotency is per recipient since subscriptions were added
+    conn.execute(text("DROP INDEX IF EXISTS ux_email_log_contact_type_date"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_email_log_contact_type_date_to "
+        "ON email_log (contact_id, reminder_type, send_date, email_to)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_email_log_created_at ON email_log (created_at)"
+    ))
+    for statement in BASELINE_INDEXES_DDL:
+        conn.execute(text(statement))
+
+
+# FTS5 index over contact name/note. The trigram tokenizer matches any
+# substring of 3+ characters, which works for CJK names without word breaks.
+SEARCH_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5("
+    "name, note, content='contacts', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    "INSERT INTO contacts_fts(rowid, name, note) VALUES (new.id, new.name, new.note); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    "INSERT INTO contacts_fts(contacts_fts, rowid, name, note) "
+    "VALUES ('delete', old.id, old.name, old.note); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE OF name, note ON contacts BEGIN "
+    "INSERT INTO contacts_fts(contacts_fts, rowid, name, note) "
+    "VALUES ('delete', old.id, old.name, old.note); "
+    "INSERT INTO contacts_fts(rowid, name, note) VALUES (new.id, new.name, new.note); "
+    "END",
+    # Index the rows that existed before the table was created
+    "INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')",
+]
+
+
+def _create_search_index(conn: Connection):
+    """Create the contact full-text index and its sync triggers."""
+    try:
+        conn.execute(text(SEARCH_INDEX_DDL[0]))
+    except OperationalError as e:
+        # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer)
+        print(f"   ⚠️  Full-text search unavailable, falling back to LIKE: {e}")
+        return
+    for statement in SEARCH_INDEX_DDL[1:]:
+        conn.execute(text(statement))
+
+
+# Every 1- and 2-character substring of each contact name, for search terms
+# too short for the trigram index. contacts_name_positions numbers the
+# characters of a name (up to Contact.name's 100), as triggers can't use WITH.
+def _name_grams(name: str) -> str:
+    return (
+        f"SELECT substr(lower({name}), n, 1) AS gram FROM contacts_name_positions "
+        f"WHERE n <= length({name}) "
+        f"UNION SELECT substr(lower({name}), n, 2) FROM contacts_name_positions "
+        f"WHERE n < length({name})"
+    )
+
+
+NAME_GRAMS_DDL = [
+    "CREATE TABLE IF NOT EXISTS contacts_name_positions (n INTEGER PRIMARY KEY)",
+    "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < 100) "
+    "INSERT OR IGNORE INTO contacts_name_positions (n) SELECT n FROM seq",
+    "CREATE TABLE IF NOT EXISTS contacts_name_grams ("
+    "gram TEXT NOT NULL, contact_id INTEGER NOT NULL, "
+    "PRIMARY KEY (gram, contact_id)) WITHOUT ROWID",
+    "CREATE TRIGGER IF NOT EXISTS contacts_name_grams_ai AFTER INSERT ON contacts BEGIN "
+    "INSERT OR IGNORE INTO contacts_name_grams (gram, contact_id) "
+    f"SELECT gram, new.id FROM ({_name_grams('new.name')}); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_name_grams_ad AFTER DELETE ON contacts BEGIN "
+    "DELETE FROM contacts_name_grams "
+    f"WHERE contact_id = old.id AND gram IN ({_name_grams('old.name')}); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_name_grams_au AFTER UPDATE OF name ON contacts "
+    "WHEN old.name IS NOT new.name BEGIN "
+    "DELETE FROM contacts_name_grams "
+    f"WHERE contact_id = old.id AND gram IN ({_name_grams('old.name')}); "
+    "INSERT OR IGNORE INTO contacts_name_grams (gram, contact_id) "
+    f"SELECT gram, new.id FROM ({_name_grams('new.name')}); "
+    "END",
+    # Index the rows that existed before the table was created
+    "INSERT OR IGNORE INTO contacts_name_grams (gram, contact_id) "
+    "SELECT substr(lower(name), n, 1), id FROM contacts "
+    "JOIN contacts_name_positions ON n <= length(name) "
+    "UNION SELECT substr(lower(name), n, 2), id FROM contacts "
+    "JOIN contacts_name_positions ON n < length(name)",
+]
+
+
+def _create_name_grams(conn: Connection):
+    """Create the short-term name search index and its sync triggers."""
+    for statement in NAME_GRAMS_DDL:
+        conn.execute(text(statement))
+
+
+# Counter bumped whenever a contact is added, removed or changes birthday.
+# Each worker's in-memory birthday calendar compares it to the version it
+# was built from, so writes by other processes are noticed.
+CONTACTS_VERSION_DDL = [
+    "CREATE TABLE IF NOT EXISTS contacts_version (version INTEGER NOT NULL)",
+    "INSERT INTO contacts_version (version) "
+    "SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM contacts_version)",
+    "CREATE TRIGGER IF NOT EXISTS contacts_version_ai AFTER INSERT ON contacts BEGIN "
+    "UPDATE contacts_version SET version = version + 1; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_version_ad AFTER DELETE ON contacts BEGIN "
+    "UPDATE contacts_version SET version = version + 1; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_version_au AFTER UPDATE OF birthday_md ON contacts "
+    "WHEN old.birthday_md IS NOT new.birthday_md BEGIN "
+    "UPDATE contacts_version SET version = version + 1; "
+    "END",
+]
+
+
+def _create_contacts_version(conn: Connection):
+    """Create the contact change counter and the triggers that bump it."""
+    for statement in CONTACTS_VERSION_DDL:
+        conn.execute(text(statement))
+
+
+def _create_observed_md_indexes(conn: Connection):
+    """Index the observed month-day of contacts for non-leap years (see models.observed_birthday_md)."""
+    for name, observed in (("feb28", 228), ("mar1", 301)):
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_contacts_observed_md_{name} ON contacts "
+            f"(CASE WHEN (birthday_md = 229) THEN {observed} ELSE birthday_md END, id)"
+        ))
+
+
+def _create_data_version(conn: Connection):
+    """
+    Create the page data version row and the triggers that bump it.
+
+    Every write to a table the HTML pages show bumps it, so each worker's
+    conditional-GET validators follow writes made by any process.
+    """
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS data_version ("
+        "version INTEGER NOT NULL, modified_at DATETIME NOT NULL)"
+    ))
+    conn.execute(text(
+        "INSERT INTO data_version (version, modified_at) "
+        "SELECT 0, CURRENT_TIMESTAMP WHERE NOT EXISTS (SELECT 1 FROM data_version)"
+    ))
+    for table in ("contacts", "email_log"):
+        for suffix, event in (("ai", "INSERT"), ("ad", "DELETE"), ("au", "UPDATE")):
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_data_version_{suffix} "
+                f"AFTER {event} ON {table} BEGIN "
+                "UPDATE data_version SET version = version + 1, modified_at = CURRENT_TIMESTAMP; "
+                "END"
+            ))
+
+
+def _create_check_runs(conn: Connection):
+    """Create the table of birthday check runs shared by all workers."""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS check_runs ("
+        "id VARCHAR(12) NOT NULL, "
+        '"trigger" VARCHAR(20) NOT NULL, '
+        "status VARCHAR(20) NOT NULL, "
+        "active INTEGER, "
+        "holder VARCHAR(255) NOT NULL, "
+        "started_at DATETIME NOT NULL, "
+        "updated_at DATETIME NOT NULL, "
+        "finished_at DATETIME, "
+        "scanned INTEGER NOT NULL, "
+        "queued INTEGER NOT NULL, "
+        "sent INTEGER NOT NULL, "
+        "failed INTEGER NOT NULL, "
+        "skipped INTEGER NOT NULL, "
+        "error TEXT, "
+        "PRIMARY KEY (id), "
+        "UNIQUE (active))"
+    ))
+
+
+# Objects outside the models that a new database gets along with create_all
+SCHEMA_EXTRAS: list[Callable[[Connection], None]] = [
+    _create_search_index, _create_contacts_version, _create_data_version, _create_name_grams,
+]
+
+# (version, description, upgrade function), in the order they are applied
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Upgrade databases created before schema versioning", _upgrade_legacy_schema),
+    (2, "Contact full-text search index", _create_search_index),
+    (3, "Contact change counter for the birthday calendar", _create_contacts_version),
+    (4, "Contact index by observed birthday in non-leap years", _create_observed_md_indexes),
+    (5, "Page data version for conditional GET", _create_data_version),
+    (6, "Birthday check runs shared by all workers", _create_check_runs),
+    (7, "Contact name index for 1-2 character search terms", _create_name_grams),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _tables(conn: Connection) -> set[str]:
+    return set(conn.execute(text(
+        "SELECT name FROM sqlite_master "
+        "WHERE type = 'table' AND name IN ('schema_version', 'contacts')"
+    )).scalars())
+
+
+def current_version(conn: Connection) -> int | None:
+    """
+    Schema version of the database.
+
+    Returns:
+        The highest applied version, 0 for a database that predates
+        versioning, or None for an empty database
+    """
+    tables = _tables(conn)
+    if "schema_version" in tables:
+        return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    return 0 if "contacts" in tables else None
+
+
+def _record(conn: Connection, version: int, description: str):
+    conn.execute(
+        text(
+            "INSERT INTO schema_version (version, description, applied_at) "
+            "VALUES (:version, :description, :applied_at)"
+        ),
+        {"version": version, "description": description, "applied_at": datetime.now().isoformat(sep=" ")},
+    )
+
+
+def migrate(engine: Engine) -> int:
+    """
+    Create or upgrade the schema to LATEST_VERSION.
+
+    Safe to run from several workers at once: each step takes SQLite's
+    write lock (BEGIN IMMEDIATE) and re-reads the version before acting.
+
+    Returns:
+        Number of migrations applied (0 if the schema was already current)
+    """
+    with engine.connect() as conn:
+        if current_version(conn) == LATEST_VERSION:
+            return 0
+
+    applied = 0
+    # Autocommit hands transaction control to the explicit BEGIN/COMMIT below
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        while True:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                version = current_version(conn)
+                if version == LATEST_VERSION:
+                    conn.exec_driver_sql("COMMIT")
+                    return applied
+
+                conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS schema_version ("
+                    "version INTEGER PRIMARY KEY, "
+                    "description VARCHAR(200) NOT NULL, "
+                    "applied_at DATETIME NOT NULL)"
+                ))
+                if version is None:
+                    # Empty database: create the current schema directly
+                    Base.metadata.create_all(bind=conn)
+                    for create in SCHEMA_EXTRAS:
+                        create(conn)
+                    _record(conn, LATEST_VERSION, "Create schema")
+                    print(f"   ✅ Database schema created (version {LATEST_VERSION})")
+                else:
+                    number, description, upgrade = next(m for m in MIGRATIONS if m[0] > version)
+                    upgrade(conn)
+                    _record(conn, number, description)
+                    print(f"   ✅ Database migrated to version {number}: {description}")
+                conn.exec_driver_sql("COMMIT")
+                applied += 1
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
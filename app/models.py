@@ -3,14 +3,46 @@ SQLAlchemy models for Birthday Notify Bird.
 """
 from __future__ import annotations
 
+import calendar
 from datetime import datetime, date
 from typing import Optional
-from sqlalchemy import String, Text, Date, DateTime, Integer, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Text, Date, DateTime, Integer, ForeignKey, Index, case, literal_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
+from app import settings
 from app.db import Base
 
 
+# Days before the birthday each reminder type is due
+REMINDER_OFFSETS = {"today": 0, "day": 1, "week": 7}
+
+
+def birthday_key(d: date) -> int:
+    """Encode the month and day of a date as MMDD (e.g. 3月5日 -> 305)."""
+    return d.month * 100 + d.day
+
+
+def birthday_in_year(month: int, day: int, year: int) -> date:
+    """
+    The day a birthday is observed in a given year.
+    
+    Feb 29 birthdays fall on Feb 28 or Mar 1 in non-leap years, per FEB29_RULE.
+    """
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return date(year, 3, 1) if settings.FEB29_RULE == "mar1" else date(year, 2, 28)
+
+
+def next_birthday(birthday: date, today: date) -> date:
+    """Next occurrence of a birthday on or after today."""
+    for year in (today.year, today.year + 1):
+        candidate = birthday_in_year(birthday.month, birthday.day, year)
+        if candidate >= today:
+            return candidate
+    raise AssertionError("unreachable: a birthday recurs within a year")
+
+
 class Contact(Base):
     """Contact with birthday information."""
     __tablename__ = "contacts"
@@ -18,6 +50,8 @@ class Contact(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     birthday: Mapped[date] = mapped_column(Date, nullable=False)
+    # Month-day key (MMDD) kept in sync with birthday, indexed for date lookups
+    birthday_md: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
     note: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.now, nullable=False
@@ -31,6 +65,17 @@ class Contact(Base):
         back_populates="contact", cascade="all, delete-orphan"
     )
 
+    # Recipients subscribed to this contact's reminders (none -> TO_EMAIL)
+    recipients: Mapped[list["Recipient"]] = relationship(
+        secondary="subscriptions", back_populates="contacts", order_by="Recipient.email"
+    )
+
+    @validates("birthday")
+    def _sync_birthday_md(self, key: str, value: date) -> date:
+        """Keep birthday_md in sync whenever birthday is assigned."""
+        self.birthday_md = birthday_key(value)
+        return value
+
     @property
     def birthday_display(self) -> str:
         """Format birthday for display (MM-DD)."""
@@ -45,9 +90,74 @@ class Contact(Base):
         return f"<Contact(id={self.id}, name='{self.name}', birthday={self.birthday})>"
 
 
+def _feb29_moved_to(observed: int):
+    # Constants are inlined: SQLite only matches an indexed expression literally
+    birthday_md = Contact.__table__.c.birthday_md
+    return case(
+        (birthday_md == literal_column("229"), literal_column(str(observed))),
+        else_=birthday_md,
+    )
+
+
+def observed_birthday_md(year: int):
+    """
+    SQL for the month-day a contact's birthday is observed on in a given year.
+    
+    That is birthday_md, except that Feb 29 becomes 228 or 301 in non-leap
+    years, per FEB29_RULE. Either form has an index, so ordered scans on it
+    stay cheap.
+    """
+    if calendar.isleap(year):
+        return Contact.birthday_md
+    return _feb29_moved_to(birthday_key(birthday_in_year(2, 29, year)))
+
+
+# Indexes on observed_birthday_md for non-leap years, one per FEB29_RULE
+Index("ix_contacts_observed_md_feb28", _feb29_moved_to(228), Contact.id)
+Index("ix_contacts_observed_md_mar1", _feb29_moved_to(301), Contact.id)
+
+
+class Recipient(Base):
+    """Email address that receives reminders for the contacts it subscribes to."""
+    __tablename__ = "recipients"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    email: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, nullable=False
+    )
+
+    contacts: Mapped[list["Contact"]] = relationship(
+        secondary="subscriptions", back_populates="recipients"
+    )
+
+    def __repr__(self) -> str:
+        return f"<Recipient(id={self.id}, email='{self.email}')>"
+
+
+class Subscription(Base):
+    """A recipient subscribed to one contact's reminders."""
+    __tablename__ = "subscriptions"
+
+    contact_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True
+    )
+    recipient_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("recipients.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+
 class EmailLog(Base):
     """Log of sent reminder emails (for idempotency)."""
     __tablename__ = "email_log"
+    __table_args__ = (
+        # One reminder of each type per contact, recipient and day, enforced by the database
+        Index(
+            "ux_email_log_contact_type_date_to",
+            "contact_id", "reminder_type", "send_date", "email_to",
+            unique=True,
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     contact_id: Mapped[int] = mapped_column(
@@ -64,7 +174,7 @@ class EmailLog(Base):
     )  # 'sent', 'failed'
     error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.now, nullable=False
+        DateTime, default=datetime.now, nullable=False, index=True
     )
 
     # Relationship to contact
@@ -83,3 +193,117 @@ class EmailLog(Base):
     def __repr__(self) -> str:
         return f"<EmailLog(id={self.id}, contact_id={self.contact_id}, type='{self.reminder_type}')>"
 
+
+class OutboxItem(Base):
+    """
+    A reminder waiting to be delivered (or retried) by the outbox drain.
+    
+    Rows are deleted once their final outcome is written to EmailLog.
+    """
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # Same key as EmailLog, so a reminder is queued at most once
+        Index(
+            "ux_outbox_contact_type_date_to",
+            "contact_id", "reminder_type", "send_date", "email_to",
+            unique=True,
+        ),
+        Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    contact_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("contacts.id"), nullable=False
+    )
+    reminder_type: Mapped[str] = mapped_column(String(20), nullable=False)
+    send_date: Mapped[date] = mapped_column(Date, nullable=False)  # day the reminder was due
+    target_date: Mapped[date] = mapped_column(Date, nullable=False)  # the birthday itself
+    email_to: Mapped[str] = mapped_column(String(255), nullable=False)
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default="pending"
+    )  # 'pending', 'sending'
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, nullable=False
+    )
+    # A 'sending' row whose claim ran out (crashed drain) is picked up again
+    claimed_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, nullable=False
+    )
+
+    contact: Mapped["Contact"] = relationship()
+
+    def __repr__(self) -> str:
+        return f"<OutboxItem(id={self.id}, contact_id={self.contact_id}, type='{self.reminder_type}', to='{self.email_to}')>"
+
+
+class JobState(Base):
+    """Persisted progress of a scheduled job."""
+    __tablename__ = "job_state"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    # Last day whose reminders were fully processed
+    last_run_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, onupdate=datetime.now, nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<JobState(name='{self.name}', last_run_date={self.last_run_date})>"
+
+
+class SchedulerLease(Base):
+    """Lease held by the one worker process allowed to run scheduled jobs."""
+    __tablename__ = "scheduler_lease"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(255), nullable=False)
+    # UTC; another worker may take over once this has passed
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<SchedulerLease(name='{self.name}', holder='{self.holder}')>"
+
+
+class CheckRunRecord(Base):
+    """Progress of one birthday check, shared by all workers for GET /api/runs/{id}."""
+    __tablename__ = "check_runs"
+
+    id: Mapped[str] = mapped_column(String(12), primary_key=True)
+    trigger: Mapped[str] = mapped_column(String(20), nullable=False)  # 'scheduled', 'manual', ...
+    status: Mapped[str] = mapped_column(String(20), nullable=False)  # 'queued', 'running', 'done', 'error'
+    # 1 while queued or running, NULL once finished; unique, so one check runs at a time
+    active: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, unique=True)
+    # Worker process running the check
+    holder: Mapped[str] = mapped_column(String(255), nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # Heartbeat of the running worker; an active run that stops beating is abandoned
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    scanned: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    queued: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sent: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    failed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    skipped: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or datetime.now()
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "elapsed_seconds": round((end - self.started_at).total_seconds(), 3),
+            "scanned": self.scanned,
+            "queued": self.queued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "error": self.error,
+        }
+
+    def __repr__(self) -> str:
+        return f"<CheckRunRecord(id='{self.id}', status='{self.status}')>"
@@ -0,0 +1,308 @@
+"""
+Persistent outbox of due reminders and the drain worker that delivers them.
+
+The daily scan only queues reminders (in one transaction). `drain_outbox`
+claims due items in batches, sends each recipient's share over one SMTP
+session (or as one digest), and then either records the final outcome in
+EmailLog or schedules a retry with exponential backoff and jitter, until
+OUTBOX_MAX_ATTEMPTS is reached. Permanent failures are logged at once, and
+items deferred by the SMTP rate limiter wait for budget without using up
+an attempt.
+"""
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
+
+from app import settings
+from app.db import SessionLocal
+from app.emailer import (
+    DEFERRED_ERROR, TEMPORARY_ERROR, create_reminder_email, rate_limiter, send_batch, send_digest, smtp_pool,
+)
+from app.metrics import REMINDERS
+from app.models import Contact, EmailLog, OutboxItem
+
+# How long a claimed item is reserved; after that a crashed drain's items are retried
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+# One drain at a time per process
+_drain_lock = threading.Lock()
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Seconds to wait before the next try after `attempts` failed ones.
+
+    Doubles from OUTBOX_RETRY_BASE up to OUTBOX_RETRY_MAX; half of the delay
+    is random, so retries after a shared outage don't arrive in lockstep.
+    """
+    delay = min(settings.OUTBOX_RETRY_MAX, settings.OUTBOX_RETRY_BASE * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def enqueue(db, rows: list[dict]):
+    """Queue reminders in the caller's transaction; already queued ones are ignored."""
+    if rows:
+        db.execute(sqlite_insert(OutboxItem).on_conflict_do_nothing(), rows)
+
+
+def claim_batch(db, limit: int) -> list[OutboxItem]:
+    """
+    Mark up to `limit` due items as being sent and return them.
+
+    Due means pending with next_attempt_at reached, or left 'sending' by a
+    drain whose claim expired. In digest mode whole recipients are claimed,
+    as many as fit in `limit` items but at least one, so each digest goes
+    out complete.
+    """
+    now = datetime.now()
+    claimable = or_(
+        and_(OutboxItem.status == "pending", OutboxItem.next_attempt_at <= now),
+        and_(OutboxItem.status == "sending", OutboxItem.claimed_until < now),
+    )
+    if settings.DIGEST_MODE:
+        recipients = []
+        claimed = 0
+        for email_to, count in db.execute(
+            select(OutboxItem.email_to, func.count())
+            .where(claimable)
+            .group_by(OutboxItem.email_to)
+            .order_by(OutboxItem.email_to)
+        ).tuples():
+            if recipients and claimed + count > limit:
+                break
+            recipients.append(email_to)
+            claimed += count
+        due = select(OutboxItem.id).where(claimable, OutboxItem.email_to.in_(recipients))
+    else:
+        due = (
+            select(OutboxItem.id)
+            .where(claimable)
+            .order_by(OutboxItem.email_to, OutboxItem.id)
+            .limit(max(1, limit))
+        )
+    ids = db.execute(
+        update(OutboxItem)
+        .where(OutboxItem.id.in_(due))
+        .values(status="sending", claimed_until=now + CLAIM_TIMEOUT)
+        .returning(OutboxItem.id)
+    ).scalars().all()
+    db.commit()
+    if not ids:
+        return []
+    return list(db.execute(
+        select(OutboxItem)
+        .options(joinedload(OutboxItem.contact))
+        .where(OutboxItem.id.in_(ids))
+        .order_by(OutboxItem.email_to, OutboxItem.id)
+    ).scalars())
+
+
+def send_to_recipient(
+    to_email: str,
+    items: list[tuple[Contact, str, date]],
+    today: date,
+    rendered: dict[tuple[int, str], tuple[str, str, str]],
+) -> list[tuple[bool, str, str]]:
+    """
+    Deliver one recipient's reminders: a digest, or every email over one SMTP session.
+
+    Returns:
+        (success, subject, error_message) for each item, in input order
+    """
+    if settings.DIGEST_MODE:
+        return [send_digest(items, today, to_email)] * len(items)
+
+    emails = [rendered[(contact.id, reminder_type)] for contact, reminder_type, _ in items]
+    return [
+        (success, email[0], error)
+        for email, (success, error) in zip(emails, send_batch(to_email, emails))
+    ]
+
+
+def dispatch_reminders(
+    batches: dict[str, list[tuple[Contact, str, date]]],
+    today: date,
+    run=None,
+) -> dict[str, list[tuple[bool, str, str]]]:
+    """
+    Send each recipient's reminders through a bounded thread pool.
+
+    Each reminder is rendered once however many recipients it fans out to,
+    and each recipient is handled by one worker over one SMTP session.
+
+    Args:
+        batches: Recipient email -> (contact, reminder_type, target_date) tuples
+        today: The date of the run
+        run: Optional CheckRun whose counters are updated as results arrive
+
+    Returns:
+        Recipient email -> (success, subject, error_message) per item, in input order
+    """
+    if not batches:
+        return {}
+
+    rendered: dict[tuple[int, str], tuple[str, str, str]] = {}
+    if not settings.DIGEST_MODE:
+        for items in batches.values():
+            for contact, reminder_type, target_date in items:
+                key = (contact.id, reminder_type)
+                if key not in rendered:
+                    rendered[key] = create_reminder_email(contact, reminder_type, target_date, today)
+
+    total = sum(len(items) for items in batches.values())
+    print(f"   📧 Sending {total} reminder(s) to {len(batches)} recipient(s) "
+          f"(concurrency {settings.SEND_CONCURRENCY})...")
+    workers = max(1, min(settings.SEND_CONCURRENCY, len(batches)))
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reminder-send") as pool:
+        futures = {
+            pool.submit(send_to_recipient, to_email, items, today, rendered): to_email
+            for to_email, items in batches.items()
+        }
+        for future in as_completed(futures):
+            to_email = futures[future]
+            results[to_email] = future.result()
+            if run is not None:
+                for success, _, _ in results[to_email]:
+                    run.record(success)
+    return results
+
+
+def record_outcomes(db, outcomes: list[tuple[OutboxItem, bool, str, str]]) -> int:
+    """
+    Log final outcomes to EmailLog and reschedule retryable failures.
+
+    In digest mode all retried items of a recipient get the same
+    next_attempt_at, so the digest is retried as a unit.
+
+    Returns:
+        Number of reminders sent
+    """
+    now = datetime.now()
+    log_rows, finished, retries = [], [], []
+    sent_count = 0
+    deferred_until = now + timedelta(seconds=max(1.0, rate_limiter.wait_time()))
+    digest_delays: dict[str, float] = {}
+    for item, success, subject, error in outcomes:
+        contact = item.contact
+        if not success and error.startswith(DEFERRED_ERROR):
+            # Never attempted: come back once the send budget allows
+            retries.append({
+                "id": item.id,
+                "status": "pending",
+                "attempts": item.attempts,
+                "next_attempt_at": deferred_until,
+                "claimed_until": None,
+                "last_error": error,
+            })
+            continue
+
+        attempts = item.attempts + 1
+        retryable = error.startswith(TEMPORARY_ERROR)
+        if success or not retryable or attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            log_rows.append({
+                "contact_id": item.contact_id,
+                "reminder_type": item.reminder_type,
+                "send_date": item.send_date,
+                "email_to": item.email_to,
+                "subject": subject,
+                "status": "sent" if success else "failed",
+                "error": None if success else f"{error}（已尝试 {attempts} 次）",
+            })
+            finished.append(item.id)
+            REMINDERS.inc(reminder_type=item.reminder_type, result="sent" if success else "failed")
+            if success:
+                sent_count += 1
+                print(f"   ✅ Sent: {contact.name} ({item.reminder_type}) -> {item.email_to}")
+            else:
+                print(f"   ❌ Failed: {contact.name} ({item.reminder_type}) -> {item.email_to} - {error}")
+        else:
+            if settings.DIGEST_MODE:
+                delay = digest_delays.setdefault(item.email_to, retry_delay(attempts))
+            else:
+                delay = retry_delay(attempts)
+            retries.append({
+                "id": item.id,
+                "status": "pending",
+                "attempts": attempts,
+                "next_attempt_at": now + timedelta(seconds=delay),
+                "claimed_until": None,
+                "last_error": error,
+            })
+            REMINDERS.inc(reminder_type=item.reminder_type, result="retried")
+            print(f"   🔁 Retry {attempts}/{settings.OUTBOX_MAX_ATTEMPTS} in {delay:.0f}s: "
+                  f"{contact.name} ({item.reminder_type}) -> {item.email_to} - {error}")
+
+    if log_rows:
+        # Rows logged meanwhile by another drain are rejected by the unique index
+        db.execute(sqlite_insert(EmailLog).on_conflict_do_nothing(), log_rows)
+    if finished:
+        db.execute(delete(OutboxItem).where(OutboxItem.id.in_(finished)))
+    if retries:
+        db.execute(update(OutboxItem), retries)
+    db.commit()
+    return sent_count
+
+
+def drain_outbox(today: date, run=None, wait: bool = True) -> int:
+    """
+    Send every outbox item that is due, batch by batch.
+
+    Items rescheduled for a later retry are left for a future drain.
+
+    Args:
+        today: The date of the run (used for digests and catch-up subjects)
+        run: Optional CheckRun whose counters are updated as results arrive
+        wait: Wait for a drain already running in this process instead of returning
+
+    Returns:
+        Number of reminders sent
+    """
+    if not _drain_lock.acquire(blocking=wait):
+        return 0
+    sent_count = 0
+    claimed_any = False
+    try:
+        while True:
+            db = SessionLocal()
+            try:
+                items = claim_batch(db, settings.OUTBOX_BATCH_SIZE)
+                if not items:
+                    return sent_count
+                claimed_any = True
+
+                # Items whose contact was deleted meanwhile are dropped
+                orphans = [item.id for item in items if item.contact is None]
+                if orphans:
+                    db.execute(delete(OutboxItem).where(OutboxItem.id.in_(orphans)))
+                    db.commit()
+                items = [item for item in items if item.contact is not None]
+
+                by_recipient: dict[str, list[OutboxItem]] = {}
+                for item in items:
+                    by_recipient.setdefault(item.email_to, []).append(item)
+                results = dispatch_reminders(
+                    {
+                        to_email: [(item.contact, item.reminder_type, item.target_date) for item in group]
+                        for to_email, group in by_recipient.items()
+                    },
+                    today,
+                    run,
+                )
+                sent_count += record_outcomes(db, [
+                    (item, *result)
+                    for to_email, group in by_recipient.items()
+                    for item, result in zip(group, results[to_email])
+                ])
+            finally:
+                db.close()
+    finally:
+        if claimed_any:
+            # Don't hold SMTP connections open until the next drain
+            smtp_pool.close()
+        _drain_lock.release()
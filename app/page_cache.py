@@ -0,0 +1,140 @@
+"""
+Conditional GET support for the HTML pages.
+
+The database keeps a data version that triggers bump on every write to
+the tables the pages show (contacts, email_log), whichever process makes
+it. Pages derive their ETag from that version, read with one query, so a
+poll with a matching If-None-Match is answered with 304 before any other
+database work, and an optional LRU cache keeps recently rendered bodies
+per (URL, version).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import settings
+
+# Source files and settings that shape the rendered pages
+APP_DIR = Path(__file__).resolve().parent
+PAGE_SOURCE_SUFFIXES = (".py", ".html")
+PAGE_SETTINGS = ("ROOT_PATH", "TIMEZONE", "DAILY_RUN_AT")
+
+
+def _deploy_token() -> str:
+    """
+    Hash of the page code, templates and settings.
+
+    It is the same in every worker of a deployment, so a poll answered by
+    another worker still matches, and changes when a new release or config
+    could render the same data differently.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(APP_DIR.rglob("*")):
+        if path.suffix in PAGE_SOURCE_SUFFIXES and "__pycache__" not in path.parts:
+            digest.update(path.relative_to(APP_DIR).as_posix().encode())
+            digest.update(path.read_bytes())
+    for name in PAGE_SETTINGS:
+        digest.update(f"{name}={getattr(settings, name)}".encode())
+    return digest.hexdigest()[:8]
+
+
+# Distinguishes ETags of this deployment from those of a previous one
+_DEPLOY_TOKEN = _deploy_token()
+
+_lock = threading.Lock()
+_pages: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+
+# Bumped by the data_version triggers (see migrations._create_data_version)
+DATA_VERSION_QUERY = text("SELECT version, modified_at FROM data_version")
+
+
+async def data_version(db: AsyncSession) -> tuple[int, datetime]:
+    """Current data version and the UTC time of the write that set it."""
+    version, modified_at = (await db.execute(DATA_VERSION_QUERY)).one()
+    return version, datetime.fromisoformat(modified_at).replace(tzinfo=timezone.utc)
+
+
+def _state(request: Request, vary: str, version: int) -> tuple[str, str]:
+    """Return (cache key, ETag) for a page request."""
+    key = f"{request.url.path}?{request.url.query}"
+    etag = f'W/"{_DEPLOY_TOKEN}-{version}{"-" + vary if vary else ""}"'
+    return key, etag
+
+
+def _not_modified(request: Request, etag: str, modified_at: datetime, vary: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in (tag.strip() for tag in if_none_match.split(","))
+
+    # Last-Modified only tracks data changes, not the extra `vary` inputs
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and not vary:
+        try:
+            return modified_at <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _validators(etag: str, modified_at: datetime) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(modified_at, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+
+class CachedPage:
+    """
+    Conditional-GET handling for one page request.
+    
+    The ETag is fixed when the object is created, before any rendering, so
+    a write that lands mid-render can never be cached under the new version.
+    
+    Usage:
+        page = CachedPage(request, await data_version(db), vary=str(today))
+        if (response := page.lookup()) is not None:
+            return response
+        return page.store(templates.TemplateResponse(...))
+    """
+
+    def __init__(self, request: Request, state: tuple[int, datetime], vary: str = ""):
+        self.request = request
+        self.vary = vary
+        version, self.modified_at = state
+        self.key, self.etag = _state(request, vary, version)
+
+    def lookup(self) -> Response | None:
+        """Return a 304 or cached 200 response, or None if the page must be rendered."""
+        headers = _validators(self.etag, self.modified_at)
+        if _not_modified(self.request, self.etag, self.modified_at, self.vary):
+            return Response(status_code=304, headers=headers)
+        
+        with _lock:
+            entry = _pages.get(self.key)
+            if entry is not None and entry[0] == self.etag:
+                _pages.move_to_end(self.key)
+                return HTMLResponse(entry[1], headers=headers)
+        return None
+
+    def store(self, response: Response) -> Response:
+        """Attach validators to a freshly rendered page and cache its body."""
+        if response.status_code != 200:
+            return response
+        
+        response.headers.update(_validators(self.etag, self.modified_at))
+        if settings.PAGE_CACHE_SIZE > 0:
+            with _lock:
+                _pages[self.key] = (self.etag, bytes(response.body))
+                _pages.move_to_end(self.key)
+                while len(_pages) > settings.PAGE_CACHE_SIZE:
+                    _pages.popitem(last=False)
+        return response
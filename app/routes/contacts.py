@@ -2,18 +2,32 @@
 Contact management routes.
 """
 from datetime import date, datetime
-from fastapi import APIRouter, Request, Depends, Form, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from itertools import islice
+from fastapi import APIRouter, Request, Depends, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import column, func, insert, select, or_, table, text, tuple_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import selectinload
 
-from app.db import get_db
-from app.models import Contact
+from app import contact_io
+from app.birthday_calendar import VERSION_QUERY, birthday_calendar, load_calendar
+from app.db import AsyncSessionLocal, get_db
+from app.models import Contact, Recipient, birthday_key, next_birthday, observed_birthday_md
+from app.page_cache import CachedPage, data_version
 from app.templates_config import templates
 from app import settings
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
+# Rows per INSERT/commit on import and per chunk on export
+IMPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 500
+
+# Error rows listed in an import report (the count is always exact)
+MAX_REPORTED_ERRORS = 1000
+
 def url_with_root(path: str) -> str:
     """Helper to add root_path prefix to redirect URLs."""
     root = settings.ROOT_PATH.rstrip("/")
@@ -21,6 +35,42 @@ def url_with_root(path: str) -> str:
     return f"{root}{path}"
 
 
+def parse_recipients(raw: str) -> list[str]:
+    """Split a comma/whitespace separated list of emails, lowercased and de-duplicated."""
+    emails = []
+    for email in raw.replace(",", " ").replace("，", " ").split():
+        email = email.strip().lower()
+        if "@" not in email.strip("@") or len(email) > 255:
+            raise ValueError(f"邮箱格式无效: {email}")
+        if email not in emails:
+            emails.append(email)
+    return emails
+
+
+async def contacts_version(db: AsyncSession) -> int:
+    """
+    Read the contact change counter after flushing pending writes.
+    
+    Inside a write transaction the counter already includes this request's
+    change, and no other writer can move it until the commit.
+    """
+    await db.flush()
+    return (await db.execute(VERSION_QUERY)).scalar_one()
+
+
+async def get_recipients(db: AsyncSession, emails: list[str]) -> list[Recipient]:
+    """Load the recipients for emails, creating the ones that don't exist yet."""
+    if not emails:
+        return []
+    existing = {
+        recipient.email: recipient
+        for recipient in (await db.execute(
+            select(Recipient).where(Recipient.email.in_(emails))
+        )).scalars()
+    }
+    return [existing.get(email) or Recipient(email=email) for email in emails]
+
+
 @router.get("/new", response_class=HTMLResponse)
 async def new_contact_form(request: Request):
     """Show form to create new contact."""
@@ -40,7 +90,8 @@ async def create_contact(
     name: str = Form(...),
     birthday: str = Form(...),
     note: str = Form(""),
-    db: Session = Depends(get_db),
+    recipients: str = Form(""),
+    db: AsyncSession = Depends(get_db),
 ):
     """Create a new contact."""
     try:
@@ -51,60 +102,335 @@ async def create_contact(
             {
                 "request": request,
                 "contact": {"name": name, "birthday": birthday, "note": note},
+                "recipients": recipients,
                 "action": "new",
                 "error": "日期格式无效，请使用 YYYY-MM-DD 格式",
             },
             status_code=400,
         )
     
+    try:
+        name = contact_io.clean_name(name)
+        emails = parse_recipients(recipients)
+    except ValueError as e:
+        return templates.TemplateResponse(
+            "contacts/form.html",
+            {
+                "request": request,
+                "contact": {"name": name, "birthday": birthday_date, "note": note},
+                "recipients": recipients,
+                "action": "new",
+                "error": str(e),
+            },
+            status_code=400,
+        )
+    
     contact = Contact(
-        name=name.strip(),
+        name=name,
         birthday=birthday_date,
         note=note.strip() if note else None,
+        recipients=await get_recipients(db, emails),
     )
     db.add(contact)
-    db.commit()
+    version = await contacts_version(db)
+    await db.commit()
+    birthday_calendar.patch(version, contact.id, new_md=contact.birthday_md)
     
     return RedirectResponse(url=url_with_root("/contacts"), status_code=303)
 
 
+# Trigram full-text search needs at least 3 characters per term
+MIN_FTS_TERM_LENGTH = 3
+
+# Every 1- and 2-character substring of each name (see migrations._create_name_grams)
+contacts_name_grams = table("contacts_name_grams", column("gram"), column("contact_id"))
+
+
+def _contains(term: str):
+    """Condition: name or note contains term (unindexed LIKE)."""
+    pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return or_(
+        Contact.name.like(pattern, escape="\\"),
+        Contact.note.like(pattern, escape="\\"),
+    )
+
+
+async def search_contacts(db: AsyncSession, q: str, limit: int) -> list[Contact]:
+    """
+    Find contacts matching every term of q.
+    
+    Terms of 3+ characters match name or note through the contacts_fts
+    trigram index. Shorter terms (common for Chinese names) are too short
+    for it and match names only, through the contacts_name_grams index;
+    longer terms in the same query then filter those candidates.
+    """
+    terms = q.split()
+    short_terms = [term for term in terms if len(term) < MIN_FTS_TERM_LENGTH]
+    long_terms = [term for term in terms if len(term) >= MIN_FTS_TERM_LENGTH]
+    ids: list[int] | None = None
+    if short_terms:
+        # Walks the first term's postings in id order, stopping at `limit` matches
+        grams = contacts_name_grams.c
+        query = select(grams.contact_id).where(grams.gram == func.lower(short_terms[0]))
+        for term in short_terms[1:]:
+            query = query.where(grams.contact_id.in_(
+                select(grams.contact_id).where(grams.gram == func.lower(term))
+            ))
+        if long_terms:
+            query = query.join(Contact, Contact.id == grams.contact_id)
+            for term in long_terms:
+                query = query.where(_contains(term))
+        ids = (await db.execute(query.order_by(grams.contact_id).limit(limit))).scalars().all()
+    else:
+        # Quote each term so FTS5 operators in user input are taken literally
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        try:
+            ids = (await db.execute(
+                text(
+                    "SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH :match "
+                    "ORDER BY rank LIMIT :limit"
+                ),
+                {"match": match, "limit": limit},
+            )).scalars().all()
+        except OperationalError:
+            ids = None  # No FTS5 index in this database
+    
+    if ids is None:
+        query = select(Contact)
+        for term in terms:
+            query = query.where(_contains(term))
+        return list((await db.execute(query.order_by(Contact.id).limit(limit))).scalars().all())
+    
+    contacts = {
+        contact.id: contact
+        for contact in (await db.execute(select(Contact).where(Contact.id.in_(ids)))).scalars()
+    }
+    return [contacts[contact_id] for contact_id in ids if contact_id in contacts]
+
+
+def parse_cursor(cursor: str | None) -> tuple[int, int, int] | None:
+    """Parse a '<segment>,<observed month-day>,<id>' cursor; None if absent or invalid."""
+    if not cursor:
+        return None
+    try:
+        segment, md, contact_id = (int(part) for part in cursor.split(","))
+    except ValueError:
+        return None
+    if segment not in (0, 1):
+        return None
+    return segment, md, contact_id
+
+
 @router.get("", response_class=HTMLResponse)
-async def list_contacts(request: Request, db: Session = Depends(get_db)):
-    """List all contacts."""
-    contacts = db.execute(
-        select(Contact).order_by(Contact.birthday)
-    ).scalars().all()
+async def list_contacts(
+    request: Request,
+    after: str | None = None,
+    q: str = "",
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    List contacts ordered by their next birthday.
+    
+    The book is split at today's month-day: segment 0 holds birthdays still
+    ahead this year, segment 1 those that wrap to next year. Each segment is
+    read in (observed month-day, id) index order, where Feb 29 birthdays
+    move to the day FEB29_RULE picks in non-leap years, as in next_birthday.
+    `after` is a keyset cursor into that sequence, so every page costs the
+    same regardless of book size.
     
-    # Calculate upcoming birthdays
+    With `q`, shows the best full-text matches instead.
+    """
+    per_page = 50
     today = date.today()
-    for contact in contacts:
-        # Calculate days until next birthday
-        next_birthday = date(today.year, contact.birthday.month, contact.birthday.day)
-        if next_birthday < today:
-            next_birthday = date(today.year + 1, contact.birthday.month, contact.birthday.day)
-        contact.days_until = (next_birthday - today).days
     
-    # Sort by days until birthday
-    contacts = sorted(contacts, key=lambda c: c.days_until)
+    # days_until depends on the date as well as the data
+    page_cache = CachedPage(request, await data_version(db), vary=today.isoformat())
+    if (cached := page_cache.lookup()) is not None:
+        return cached
     
-    return templates.TemplateResponse(
+    q = q.strip()
+    if q:
+        contacts = await search_contacts(db, q, per_page)
+        for contact in contacts:
+            contact.days_until = (next_birthday(contact.birthday, today) - today).days
+        return page_cache.store(templates.TemplateResponse(
+            "contacts/list.html",
+            {
+                "request": request,
+                "contacts": contacts,
+                "today": today,
+                "q": q,
+                "total_count": len(contacts),
+                "next_cursor": None,
+            }
+        ))
+
+    today_md = birthday_key(today)
+    this_year = observed_birthday_md(today.year)
+    # (filter, sort key) per segment; wrapped birthdays fall in next year
+    segments = (
+        (this_year >= today_md, this_year),
+        (this_year < today_md, observed_birthday_md(today.year + 1)),
+    )
+    
+    cursor = parse_cursor(after)
+    start_segment = cursor[0] if cursor else 0
+    
+    # Fetch one extra row to know whether there is another page
+    page: list[tuple[int, int, Contact]] = []
+    for segment in range(start_segment, 2):
+        condition, key = segments[segment]
+        query = select(Contact, key).where(condition)
+        if cursor and segment == cursor[0]:
+            query = query.where(tuple_(key, Contact.id) > cursor[1:])
+        query = query.order_by(key, Contact.id).limit(per_page + 1 - len(page))
+        rows = (await db.execute(query)).tuples().all()
+        page.extend((segment, md, contact) for contact, md in rows)
+        if len(page) > per_page:
+            break
+    
+    has_more = len(page) > per_page
+    page = page[:per_page]
+    
+    contacts = []
+    for _, _, contact in page:
+        contact.days_until = (next_birthday(contact.birthday, today) - today).days
+        contacts.append(contact)
+    
+    next_cursor = None
+    if has_more:
+        segment, md, last = page[-1]
+        next_cursor = f"{segment},{md},{last.id}"
+    
+    # The birthday calendar knows the book size without a COUNT(*) scan
+    total_count = (await run_in_threadpool(load_calendar)).size
+    
+    return page_cache.store(templates.TemplateResponse(
         "contacts/list.html",
         {
             "request": request,
             "contacts": contacts,
             "today": today,
+            "total_count": total_count,
+            "next_cursor": next_cursor,
+        }
+    ))
+
+
+@router.get("/import", response_class=HTMLResponse)
+async def import_contacts_form(request: Request):
+    """Show the bulk import form."""
+    return templates.TemplateResponse(
+        "contacts/import.html",
+        {
+            "request": request,
+            "report": None,
+        }
+    )
+
+
+@router.post("/import")
+async def import_contacts(
+    request: Request,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Import contacts from a CSV or vCard upload.
+    
+    The file is parsed lazily in a worker thread and valid rows are inserted
+    in batches of IMPORT_BATCH_SIZE, one executemany + commit per batch.
+    Returns a per-row error report (JSON for API clients, HTML otherwise).
+    """
+    fmt = contact_io.detect_format(file.filename, file.content_type)
+    rows = contact_io.iter_rows(file.file, fmt)
+    
+    imported = 0
+    failed = 0
+    errors: list[dict] = []
+    while True:
+        parsed = await run_in_threadpool(lambda: list(islice(rows, IMPORT_BATCH_SIZE)))
+        if not parsed:
+            break
+        
+        batch = []
+        for line, row, error in parsed:
+            if error:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line, "error": error})
+            else:
+                batch.append(row)
+        
+        if batch:
+            await db.execute(insert(Contact), batch)
+            await db.commit()
+            imported += len(batch)
+    
+    report = {
+        "format": fmt,
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+    }
+    if "application/json" in request.headers.get("accept", ""):
+        return JSONResponse(report)
+    return templates.TemplateResponse(
+        "contacts/import.html",
+        {
+            "request": request,
+            "report": report,
         }
     )
 
 
+@router.get("/export")
+async def export_contacts(format: str = "csv"):
+    """
+    Export all contacts as CSV or vCard.
+    
+    Rows are streamed in chunks of EXPORT_CHUNK_SIZE from a server-side
+    cursor, so memory use stays constant however large the book is.
+    """
+    if format not in ("csv", "vcard"):
+        raise HTTPException(status_code=400, detail="format 只能是 csv 或 vcard")
+    
+    async def generate():
+        # The request-scoped session is closed before streaming starts,
+        # so the generator owns its own session
+        if format == "csv":
+            yield "\ufeff" + contact_io.csv_chunk([], header=True)  # BOM for Excel
+        async with AsyncSessionLocal() as db:
+            result = await db.stream_scalars(
+                select(Contact)
+                .order_by(Contact.id)
+                .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+            )
+            async for chunk in result.partitions():
+                if format == "csv":
+                    yield contact_io.csv_chunk(chunk)
+                else:
+                    yield contact_io.vcard_chunk(chunk)
+    
+    if format == "csv":
+        media_type, filename = "text/csv; charset=utf-8", "contacts.csv"
+    else:
+        media_type, filename = "text/vcard; charset=utf-8", "contacts.vcf"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/{contact_id}/edit", response_class=HTMLResponse)
 async def edit_contact_form(
     request: Request,
     contact_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Show form to edit contact."""
-    contact = db.get(Contact, contact_id)
+    contact = await db.get(Contact, contact_id, options=[selectinload(Contact.recipients)])
     if not contact:
         raise HTTPException(status_code=404, detail="联系人不存在")
     
@@ -113,6 +439,7 @@ async def edit_contact_form(
         {
             "request": request,
             "contact": contact,
+            "recipients": ", ".join(recipient.email for recipient in contact.recipients),
             "action": "edit",
         }
     )
@@ -125,10 +452,11 @@ async def update_contact(
     name: str = Form(...),
     birthday: str = Form(...),
     note: str = Form(""),
-    db: Session = Depends(get_db),
+    recipients: str = Form(""),
+    db: AsyncSession = Depends(get_db),
 ):
     """Update an existing contact."""
-    contact = db.get(Contact, contact_id)
+    contact = await db.get(Contact, contact_id, options=[selectinload(Contact.recipients)])
     if not contact:
         raise HTTPException(status_code=404, detail="联系人不存在")
     
@@ -140,16 +468,40 @@ async def update_contact(
             {
                 "request": request,
                 "contact": contact,
+                "recipients": recipients,
                 "action": "edit",
                 "error": "日期格式无效，请使用 YYYY-MM-DD 格式",
             },
             status_code=400,
         )
     
-    contact.name = name.strip()
+    try:
+        name = contact_io.clean_name(name)
+        emails = parse_recipients(recipients)
+    except ValueError as e:
+        return templates.TemplateResponse(
+            "contacts/form.html",
+            {
+                "request": request,
+                "contact": contact,
+                "recipients": recipients,
+                "action": "edit",
+                "error": str(e),
+            },
+            status_code=400,
+        )
+
+    old_md = contact.birthday_md
+    contact.name = name
     contact.birthday = birthday_date
     contact.note = note.strip() if note else None
-    db.commit()
+    contact.recipients = await get_recipients(db, emails)
+    if contact.birthday_md != old_md:
+        version = await contacts_version(db)
+        await db.commit()
+        birthday_calendar.patch(version, contact.id, old_md=old_md, new_md=contact.birthday_md)
+    else:
+        await db.commit()
     
     return RedirectResponse(url=url_with_root("/contacts"), status_code=303)
 
@@ -157,15 +509,18 @@ async def update_contact(
 @router.post("/{contact_id}/delete")
 async def delete_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Delete a contact."""
-    contact = db.get(Contact, contact_id)
+    contact = await db.get(Contact, contact_id)
     if not contact:
         raise HTTPException(status_code=404, detail="联系人不存在")
     
-    db.delete(contact)
-    db.commit()
+    old_md = contact.birthday_md
+    await db.delete(contact)
+    version = await contacts_version(db)
+    await db.commit()
+    birthday_calendar.patch(version, contact_id, old_md=old_md)
     
     return RedirectResponse(url=url_with_root("/contacts"), status_code=303)
 
@@ -1,15 +1,17 @@
 """
 Email log viewing and manual trigger routes.
 """
-from datetime import date
+from datetime import datetime
 from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import select, desc
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import select, delete, desc, func, tuple_
 
 from app.db import get_db
-from app.models import EmailLog
-from app.scheduler import trigger_check_now
+from app.models import CheckRunRecord, EmailLog
+from app.page_cache import CachedPage, data_version
 from app.templates_config import templates
 from app import settings
 
@@ -22,47 +24,109 @@ def url_with_root(path: str) -> str:
     return f"{root}{path}"
 
 
+def parse_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    """Parse a '<created_at ISO>,<id>' keyset cursor; None if absent or invalid."""
+    if not cursor:
+        return None
+    try:
+        created_at, log_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(log_id)
+    except ValueError:
+        return None
+
+
+def make_cursor(log: EmailLog) -> str:
+    """Build the keyset cursor pointing at a log row."""
+    return f"{log.created_at.isoformat()},{log.id}"
+
+
 @router.get("/logs", response_class=HTMLResponse)
 async def list_logs(
     request: Request,
-    page: int = 1,
-    db: Session = Depends(get_db),
+    before: str | None = None,
+    after: str | None = None,
+    db: AsyncSession = Depends(get_db),
 ):
-    """List email send logs."""
+    """
+    List email send logs, newest first.
+    
+    Uses keyset pagination on (created_at, id): `before` pages towards older
+    rows and `after` towards newer ones, so deep pages cost the same as the
+    first one.
+    """
     per_page = 50
-    offset = (page - 1) * per_page
+    
+    page_cache = CachedPage(request, await data_version(db))
+    if (cached := page_cache.lookup()) is not None:
+        return cached
     
     # Get total count
-    total = db.execute(select(EmailLog)).scalars().all()
-    total_count = len(total)
+    total_count = (await db.execute(select(func.count()).select_from(EmailLog))).scalar_one()
+    
+    query = select(EmailLog).options(joinedload(EmailLog.contact))
+    before_key = parse_cursor(before)
+    after_key = parse_cursor(after)
+    if after_key and not before_key:
+        # Walk forward towards newer rows, then restore newest-first order
+        query = query.where(
+            tuple_(EmailLog.created_at, EmailLog.id) > after_key
+        ).order_by(EmailLog.created_at, EmailLog.id)
+    else:
+        if before_key:
+            query = query.where(tuple_(EmailLog.created_at, EmailLog.id) < before_key)
+        query = query.order_by(desc(EmailLog.created_at), desc(EmailLog.id))
     
-    # Get paginated logs
-    logs = db.execute(
-        select(EmailLog)
-        .order_by(desc(EmailLog.created_at))
-        .offset(offset)
-        .limit(per_page)
-    ).scalars().all()
+    # Fetch one extra row to know whether there is another page
+    logs = (await db.execute(query.limit(per_page + 1))).scalars().all()
+    has_more = len(logs) > per_page
+    logs = logs[:per_page]
     
-    total_pages = (total_count + per_page - 1) // per_page
+    if after_key and not before_key:
+        logs.reverse()
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = before_key is not None, has_more
     
-    return templates.TemplateResponse(
+    return page_cache.store(templates.TemplateResponse(
         "logs/list.html",
         {
             "request": request,
             "logs": logs,
-            "page": page,
-            "total_pages": total_pages,
             "total_count": total_count,
+            "newer_cursor": make_cursor(logs[0]) if logs and has_newer else None,
+            "older_cursor": make_cursor(logs[-1]) if logs and has_older else None,
         }
-    )
+    ))
 
 
 @router.post("/api/trigger-check")
 async def trigger_check(request: Request):
-    """Manually trigger birthday check (for testing)."""
-    trigger_check_now()
-    return RedirectResponse(url=url_with_root("/logs?triggered=1"), status_code=303)
+    """
+    Manually trigger birthday check (for testing).
+    
+    The check runs in the background; JSON clients get the run id back,
+    form posts are redirected to the logs page.
+    """
+    from app.scheduler import trigger_check_now
+    
+    run_id = await run_in_threadpool(trigger_check_now)
+    if "application/json" in request.headers.get("accept", ""):
+        return JSONResponse(
+            {"run_id": run_id, "status_url": url_with_root(f"/api/runs/{run_id}")},
+            status_code=202,
+        )
+    return RedirectResponse(
+        url=url_with_root(f"/logs?triggered=1&run_id={run_id}"), status_code=303
+    )
+
+
+@router.get("/api/runs/{run_id}")
+async def get_run_status(run_id: str, db: AsyncSession = Depends(get_db)):
+    """Report the progress of a birthday check run, whichever worker runs it."""
+    run = await db.get(CheckRunRecord, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="运行记录不存在")
+    return run.to_dict()
 
 
 @router.get("/api/trigger-check", response_class=HTMLResponse)
@@ -75,28 +139,26 @@ async def trigger_check_page(request: Request):
 @router.post("/logs/{log_id}/delete")
 async def delete_log(
     log_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Delete a single log entry."""
-    log = db.get(EmailLog, log_id)
+    log = await db.get(EmailLog, log_id)
     if not log:
         raise HTTPException(status_code=404, detail="记录不存在")
     
-    db.delete(log)
-    db.commit()
+    await db.delete(log)
+    await db.commit()
     
     return RedirectResponse(url=url_with_root("/logs?deleted=1"), status_code=303)
 
 
 @router.post("/logs/clear-all")
 async def clear_all_logs(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Delete all log entries."""
-    logs = db.execute(select(EmailLog)).scalars().all()
-    for log in logs:
-        db.delete(log)
-    db.commit()
+    await db.execute(delete(EmailLog))
+    await db.commit()
     
     return RedirectResponse(url=url_with_root("/logs?cleared=1"), status_code=303)
 
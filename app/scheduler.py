@@ -1,103 +1,485 @@
 """
 Birthday reminder scheduler using APScheduler.
 """
-from datetime import datetime, timedelta
+import threading
+import time
+import uuid
+from functools import wraps
+from datetime import date, datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy import select, and_
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import select, delete, desc, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import pytz
 
 from app import settings
 from app.db import SessionLocal
-from app.models import Contact, EmailLog
-from app.emailer import send_birthday_reminder
+from app.models import (
+    REMINDER_OFFSETS, CheckRunRecord, Contact, EmailLog, JobState, OutboxItem, Recipient,
+    Subscription,
+)
+from app.birthday_calendar import birthday_calendar
+from app.emailer import smtp_pool
+from app.outbox import drain_outbox, enqueue
+from app.metrics import JOB_CONTACTS_SCANNED, JOB_DURATION, REMINDERS
+from app.leader import scheduler_lease
 
 
 # Global scheduler instance
 scheduler: BackgroundScheduler | None = None
 
+# Number of finished runs kept for GET /api/runs/{id}
+MAX_TRACKED_RUNS = 20
 
-def check_and_send_reminders():
+# How often a running check refreshes its check_runs row, and how long a
+# silent one stays active before another worker may start a new check
+RUN_HEARTBEAT_SECONDS = 5
+RUN_STALE_AFTER = timedelta(seconds=60)
+
+# JobState row recording the last day the daily check completed
+DAILY_JOB = "daily_birthday_check"
+
+# Keeps the catch-up target window under a year, so each birthday occurs in it once
+MAX_CATCHUP_DAYS = 350
+
+# Contact ids per IN (...) query when loading due contacts
+LOAD_CHUNK_SIZE = 500
+
+
+class CheckRun:
     """
-    Check for upcoming birthdays and send reminder emails.
-    This is the main job that runs daily.
+    Progress of one birthday check.
+    
+    Runs registered with `_begin_run` are also persisted (see `save`), so
+    GET /api/runs/{id} can report them from any worker.
     """
-    # Use configured timezone to determine "today"
+
+    def __init__(self, trigger: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.trigger = trigger  # 'scheduled', 'manual', 'catch-up' or 'direct'
+        self.status = "queued"  # 'queued', 'running', 'done', 'error'
+        self.started_at = datetime.now()
+        self._started = time.monotonic()
+        self._finished: float | None = None
+        self.scanned = 0
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.error: str | None = None
+        self._save_lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def record(self, success: bool):
+        """Count one send attempt (a failed one may still be retried)."""
+        if success:
+            self.sent += 1
+        else:
+            self.failed += 1
+
+    def finish(self, error: str | None = None):
+        self.error = error
+        self.status = "error" if error else "done"
+        self._finished = time.monotonic()
+
+    def to_dict(self) -> dict:
+        end = self._finished if self._finished is not None else time.monotonic()
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "elapsed_seconds": round(end - self._started, 3),
+            "scanned": self.scanned,
+            "queued": self.queued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "error": self.error,
+        }
+
+    def save(self):
+        """Write the run's progress to its check_runs row, which also serves as its heartbeat."""
+        with self._save_lock:
+            now = datetime.now()
+            db = SessionLocal()
+            try:
+                db.execute(
+                    update(CheckRunRecord)
+                    .where(CheckRunRecord.id == self.id)
+                    .values(
+                        status=self.status,
+                        active=1 if self.active else None,
+                        updated_at=now,
+                        finished_at=None if self.active else now,
+                        scanned=self.scanned,
+                        queued=self.queued,
+                        sent=self.sent,
+                        failed=self.failed,
+                        skipped=self.skipped,
+                        error=self.error,
+                    )
+                )
+                db.commit()
+            except Exception as e:
+                print(f"⚠️  Saving run {self.id} failed: {e}")
+            finally:
+                db.close()
+
+
+# Only one check runs at a time in this process; check_runs.active extends that to all workers
+_check_lock = threading.Lock()
+
+
+def _begin_run(trigger: str) -> tuple[CheckRun | None, str]:
+    """
+    Register a new run, unless a check is already active in any worker.
+    
+    An active run whose worker stopped heartbeating for RUN_STALE_AFTER is
+    marked as failed first, so a crashed worker can't block checks forever.
+    
+    Returns:
+        Tuple of (the new run or None, id of the run now active)
+    """
+    run = CheckRun(trigger)
+    now = datetime.now()
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(CheckRunRecord)
+            .where(CheckRunRecord.active == 1, CheckRunRecord.updated_at < now - RUN_STALE_AFTER)
+            .values(status="error", active=None, finished_at=now, error="运行中断：执行该检查的进程已停止")
+        )
+        # The unique `active` column lets only one worker insert an active run
+        created = db.execute(
+            sqlite_insert(CheckRunRecord)
+            .values(
+                id=run.id,
+                trigger=trigger,
+                status=run.status,
+                active=1,
+                holder=scheduler_lease.holder,
+                started_at=run.started_at,
+                updated_at=now,
+            )
+            .on_conflict_do_nothing()
+        ).rowcount
+        if not created:
+            db.commit()
+            return None, db.execute(
+                select(CheckRunRecord.id).where(CheckRunRecord.active == 1)
+            ).scalar()
+        
+        # Keep the newest MAX_TRACKED_RUNS finished runs
+        kept = select(CheckRunRecord.id).order_by(desc(CheckRunRecord.started_at)).limit(MAX_TRACKED_RUNS)
+        db.execute(delete(CheckRunRecord).where(
+            CheckRunRecord.active.is_(None), CheckRunRecord.id.not_in(kept)
+        ))
+        db.commit()
+        return run, run.id
+    finally:
+        db.close()
+
+
+def _execute_run(run: CheckRun, through: date | None = None):
+    """Run a registered check, saving its progress every RUN_HEARTBEAT_SECONDS."""
+    with _check_lock:
+        run.status = "running"
+        run.save()
+        stopped = threading.Event()
+        
+        def heartbeat():
+            while not stopped.wait(RUN_HEARTBEAT_SECONDS):
+                run.save()
+        
+        threading.Thread(target=heartbeat, name=f"check-run-{run.id}", daemon=True).start()
+        try:
+            check_and_send_reminders(run, through)
+        finally:
+            stopped.set()
+            if run.active:
+                run.finish("运行中断")
+            run.save()
+
+
+def catch_up_check(hour: int, minute: int):
+    """
+    Startup job: process days whose daily run was missed while the service was down.
+    
+    Today counts as missed only once its run time has passed; otherwise the
+    regular cron run will cover it.
+    """
+    now = local_now()
+    through = now.date()
+    if (now.hour, now.minute) < (hour, minute):
+        through -= timedelta(days=1)
+    
+    db = SessionLocal()
+    try:
+        last_run_date = get_last_run_date(db)
+    finally:
+        db.close()
+    # Nothing recorded yet (fresh install) or nothing missed
+    if last_run_date is None or last_run_date >= through:
+        return
+    
+    run, _ = _begin_run("catch-up")
+    if run is None:
+        return
+    print(f"⏪ Missed runs since {last_run_date}, catching up through {through}")
+    _execute_run(run, through)
+
+
+def scheduled_check():
+    """Daily job entry point; skipped if a manual run is already going."""
+    run, active_id = _begin_run("scheduled")
+    if run is None:
+        print(f"⏭️  Check {active_id} already in progress, skipping scheduled run")
+        return
+    _execute_run(run)
+
+
+def local_now() -> datetime:
+    """Current time in the configured timezone."""
     try:
         tz = pytz.timezone(settings.TIMEZONE)
     except pytz.exceptions.UnknownTimeZoneError:
         tz = pytz.timezone("Asia/Shanghai")
+    return datetime.now(tz)
+
+
+def get_last_run_date(db) -> date | None:
+    """Last day the daily check completed, or None if it never has."""
+    state = db.get(JobState, DAILY_JOB)
+    return state.last_run_date if state else None
+
+
+def run_days_through(last_run_date: date | None, through: date) -> list[date]:
+    """
+    Days whose reminders a run ending on `through` has to process.
+    
+    That is every day after the last completed run, capped at
+    CATCHUP_MAX_DAYS of look-back, or just `through` when nothing was missed.
+    """
+    lookback = min(max(settings.CATCHUP_MAX_DAYS, 0), MAX_CATCHUP_DAYS)
+    first = through
+    if last_run_date is not None and last_run_date < through:
+        first = max(last_run_date + timedelta(days=1), through - timedelta(days=lookback))
+    return [first + timedelta(days=i) for i in range((through - first).days + 1)]
+
+
+def check_and_send_reminders(run: CheckRun | None = None, through: date | None = None):
+    """
+    Check for upcoming birthdays and send reminder emails.
+    This is the main job that runs daily.
     
-    today = datetime.now(tz).date()
+    Days missed since the last completed run (e.g. while the service was
+    down) are caught up in the same pass: one lookup in the in-memory
+    birthday calendar covers all of them, and of the reminders a birthday
+    accumulated only the newest is sent. Logs keep the day each reminder was due, so the
+    usual idempotency applies.
+    
+    Args:
+        run: Optional run record that receives progress counters
+        through: Last day to process (defaults to today)
+    """
+    if run is None:
+        run = CheckRun("direct")
+
+    # Use configured timezone to determine "today"
+    today = local_now().date()
+    through = through or today
     print(f"🔍 Checking birthdays at {today} ({settings.TIMEZONE})...")
     
+    started = time.perf_counter()
     db = SessionLocal()
     try:
-        # Calculate target dates for each reminder type
-        reminder_dates = {
-            "today": today,
-            "day": today + timedelta(days=1),
-            "week": today + timedelta(days=7),
-        }
+        run_days = run_days_through(get_last_run_date(db), through)
+        if len(run_days) > 1:
+            print(f"   ⏪ Catching up {len(run_days)} day(s) since {run_days[0]}")
         
-        # Get all contacts
-        contacts = db.execute(select(Contact)).scalars().all()
+        # The reminder due for each birthday date reached from a run day;
+        # later run days overwrite earlier ones so each birthday gets one reminder
+        targets: dict[date, str] = {}
+        for run_day in run_days:
+            for reminder_type, offset in REMINDER_OFFSETS.items():
+                targets[run_day + timedelta(days=offset)] = reminder_type
         
-        sent_count = 0
-        for reminder_type, target_date in reminder_dates.items():
-            target_month = target_date.month
-            target_day = target_date.day
-            
-            for contact in contacts:
-                # Check if birthday matches (month and day)
-                if contact.birthday.month == target_month and contact.birthday.day == target_day:
-                    # Check if we already sent this reminder today (idempotency)
-                    existing = db.execute(
-                        select(EmailLog).where(
-                            and_(
-                                EmailLog.contact_id == contact.id,
-                                EmailLog.reminder_type == reminder_type,
-                                EmailLog.send_date == today,
-                            )
-                        )
-                    ).scalar_one_or_none()
-                    
-                    if existing:
-                        print(f"   ⏭️  Skip: {contact.name} ({reminder_type}) - already sent")
-                        continue
-                    
-                    # Send the reminder
-                    print(f"   📧 Sending: {contact.name} ({reminder_type})...")
-                    success, subject, error = send_birthday_reminder(
-                        contact, reminder_type, target_date
-                    )
-                    
-                    # Log the result
-                    log = EmailLog(
-                        contact_id=contact.id,
-                        reminder_type=reminder_type,
-                        send_date=today,
-                        email_to=settings.TO_EMAIL,
-                        subject=subject,
-                        status="sent" if success else "failed",
-                        error=error if not success else None,
-                    )
-                    db.add(log)
-                    db.commit()
-                    
-                    if success:
-                        sent_count += 1
-                        print(f"   ✅ Sent: {contact.name} ({reminder_type})")
-                    else:
-                        print(f"   ❌ Failed: {contact.name} ({reminder_type}) - {error}")
+        # Contacts whose birthday is observed on a target date, from the calendar
+        first = min(targets)
+        due: dict[int, tuple[str, date]] = {}
+        for target_date, contact_ids in birthday_calendar.sync(db).window(
+            first, (max(targets) - first).days + 1
+        ):
+            if target_date in targets:
+                for contact_id in contact_ids:
+                    due[contact_id] = (targets[target_date], target_date)
+        
+        # Load them and their subscribers by primary key, a chunk at a time
+        due_ids = sorted(due)
+        contacts: list[Contact] = []
+        recipients_by_contact: dict[int, list[str]] = {}
+        for i in range(0, len(due_ids), LOAD_CHUNK_SIZE):
+            chunk = due_ids[i:i + LOAD_CHUNK_SIZE]
+            contacts.extend(db.execute(
+                select(Contact).where(Contact.id.in_(chunk)).order_by(Contact.id)
+            ).scalars())
+            for contact_id, email in db.execute(
+                select(Subscription.contact_id, Recipient.email)
+                .join(Recipient, Recipient.id == Subscription.recipient_id)
+                .where(Subscription.contact_id.in_(chunk))
+            ).tuples():
+                recipients_by_contact.setdefault(contact_id, []).append(email)
+        run.scanned = len(contacts)
+        JOB_CONTACTS_SCANNED.inc(len(contacts))
+        
+        # Reminders already logged or queued for the run days, one query each
+        already_sent = set()
+        for model in (EmailLog, OutboxItem):
+            already_sent.update(db.execute(
+                select(model.contact_id, model.reminder_type, model.send_date, model.email_to)
+                .where(model.send_date.between(run_days[0], through))
+            ).tuples())
+        
+        # Queue the rest; contacts without subscribers go to TO_EMAIL
+        queue_rows = []
+        for contact in contacts:
+            recipients = recipients_by_contact.get(contact.id) or [settings.TO_EMAIL]
+            reminder_type, target_date = due[contact.id]
+            # The day the reminder was due, which differs from today when catching up
+            send_date = target_date - timedelta(days=REMINDER_OFFSETS[reminder_type])
+            for to_email in recipients:
+                REMINDERS.inc(reminder_type=reminder_type, result="matched")
+                if (contact.id, reminder_type, send_date, to_email) in already_sent:
+                    print(f"   ⏭️  Skip: {contact.name} ({reminder_type}) -> {to_email} - already sent or queued")
+                    run.skipped += 1
+                    REMINDERS.inc(reminder_type=reminder_type, result="skipped")
+                    continue
+                queue_rows.append({
+                    "contact_id": contact.id,
+                    "reminder_type": reminder_type,
+                    "send_date": send_date,
+                    "target_date": target_date,
+                    "email_to": to_email,
+                })
+        
+        # Queue the reminders and record progress in one transaction
+        enqueue(db, queue_rows)
+        state = db.get(JobState, DAILY_JOB) or JobState(name=DAILY_JOB)
+        if state.last_run_date is None or state.last_run_date < through:
+            state.last_run_date = through
+        db.add(state)
+        db.commit()
+        run.queued = len(queue_rows)
+        print(f"   📥 Queued {len(queue_rows)} reminder(s)")
+        
+        # Deliver right away; failures are retried by the outbox poll job
+        sent_count = drain_outbox(today, run)
         
         print(f"✅ Check complete. Sent {sent_count} reminder(s).")
+        run.finish()
         
     except Exception as e:
         print(f"❌ Error during reminder check: {e}")
         db.rollback()
+        run.finish(str(e))
+    finally:
+        db.close()
+        JOB_DURATION.observe(time.perf_counter() - started)
+
+
+def drain_outbox_job():
+    """Outbox poll job: send queued reminders whose retry time has come."""
+    drain_outbox(local_now().date(), wait=False)
+
+
+def _delete_in_batches(db, condition) -> int:
+    """Delete EmailLog rows matching condition, one bounded batch per commit."""
+    removed = 0
+    batch_size = max(1, settings.LOG_PRUNE_BATCH_SIZE)
+    while True:
+        batch = select(EmailLog.id).where(condition).limit(batch_size)
+        result = db.execute(delete(EmailLog).where(EmailLog.id.in_(batch)))
+        db.commit()
+        removed += result.rowcount
+        if result.rowcount < batch_size:
+            return removed
+
+
+def prune_email_logs() -> int:
+    """
+    Remove old EmailLog rows according to the retention settings.
+    
+    Deletes rows older than LOG_RETENTION_DAYS, then trims the table to the
+    newest LOG_MAX_ROWS rows (0 disables either rule). Work is done in
+    batches of LOG_PRUNE_BATCH_SIZE so the database is never locked for long.
+    
+    Returns:
+        Number of rows removed
+    """
+    db = SessionLocal()
+    removed = 0
+    try:
+        if settings.LOG_RETENTION_DAYS > 0:
+            cutoff = datetime.now() - timedelta(days=settings.LOG_RETENTION_DAYS)
+            removed += _delete_in_batches(db, EmailLog.created_at < cutoff)
+        
+        if settings.LOG_MAX_ROWS > 0:
+            # Newest row that falls outside the cap; it and everything older goes
+            boundary = db.execute(
+                select(EmailLog.created_at, EmailLog.id)
+                .order_by(desc(EmailLog.created_at), desc(EmailLog.id))
+                .offset(settings.LOG_MAX_ROWS)
+                .limit(1)
+            ).first()
+            if boundary:
+                removed += _delete_in_batches(
+                    db, tuple_(EmailLog.created_at, EmailLog.id) <= tuple(boundary)
+                )
+        
+        print(f"🧹 Log pruning complete. Removed {removed} row(s).")
+    except Exception as e:
+        print(f"❌ Error during log pruning: {e}")
+        db.rollback()
     finally:
         db.close()
+    return removed
+
+
+def leader_only(job):
+    """Wrap a scheduled job so it only runs in the process holding the leader lease."""
+    @wraps(job)
+    def wrapper(*args, **kwargs):
+        if not scheduler_lease.is_leader:
+            return None
+        return job(*args, **kwargs)
+    return wrapper
+
+
+def renew_leadership(hour: int, minute: int):
+    """
+    Heartbeat job run by every worker: acquire or renew the leader lease.
+    
+    A worker that just became leader queues a catch-up check, which also
+    covers a daily run missed while the previous leader was dying.
+    """
+    was_leader = scheduler_lease.is_leader
+    is_leader = scheduler_lease.try_acquire()
+    if is_leader and not was_leader:
+        print(f"👑 Scheduler leader: {scheduler_lease.holder}")
+        if settings.CATCHUP_MAX_DAYS > 0 and scheduler is not None:
+            scheduler.add_job(
+                leader_only(catch_up_check),
+                args=(hour, minute),
+                id="catch_up_check",
+                replace_existing=True,
+            )
+    elif was_leader and not is_leader:
+        print(f"⚠️  Lost scheduler leadership ({scheduler_lease.holder})")
 
 
 def start_scheduler():
@@ -123,14 +505,45 @@ def start_scheduler():
     
     scheduler = BackgroundScheduler(timezone=tz)
     
-    # Add daily job
+    # Every worker heartbeats the lease; only the holder runs the jobs below
     scheduler.add_job(
-        check_and_send_reminders,
+        renew_leadership,
+        IntervalTrigger(seconds=settings.LEADER_RENEW_SECONDS, timezone=tz),
+        args=(hour, minute),
+        id="leader_lease",
+        replace_existing=True,
+        next_run_time=datetime.now(tz),
+        coalesce=True,
+    )
+    
+    # Add daily job; a late firing still runs once, and catch-up makes it safe
+    scheduler.add_job(
+        leader_only(scheduled_check),
         CronTrigger(hour=hour, minute=minute, timezone=tz),
-        id="daily_birthday_check",
+        id=DAILY_JOB,
+        replace_existing=True,
+        misfire_grace_time=None,
+        coalesce=True,
+    )
+    
+    # Retry failed sends from the outbox
+    scheduler.add_job(
+        leader_only(drain_outbox_job),
+        IntervalTrigger(seconds=settings.OUTBOX_POLL_SECONDS, timezone=tz),
+        id="drain_outbox",
         replace_existing=True,
+        coalesce=True,
     )
     
+    # Add nightly log retention job
+    if settings.LOG_RETENTION_DAYS > 0 or settings.LOG_MAX_ROWS > 0:
+        scheduler.add_job(
+            leader_only(prune_email_logs),
+            CronTrigger(hour=3, minute=30, timezone=tz),
+            id="prune_email_logs",
+            replace_existing=True,
+        )
+    
     scheduler.start()
     print(f"   ✅ Scheduler started: daily at {hour:02d}:{minute:02d} ({settings.TIMEZONE})")
 
@@ -142,10 +555,30 @@ def stop_scheduler():
     if scheduler is not None:
         scheduler.shutdown(wait=False)
         scheduler = None
+        # Let another worker take over without waiting for the lease to expire
+        scheduler_lease.release()
+        smtp_pool.close()
         print("   ✅ Scheduler stopped")
 
 
-def trigger_check_now():
-    """Manually trigger a birthday check (for testing)."""
-    check_and_send_reminders()
+def trigger_check_now() -> str:
+    """
+    Manually trigger a birthday check in the background.
+    
+    The run is queued on the scheduler's executor and this returns
+    immediately. If a check is already in progress in any worker, that
+    run's id is returned instead of starting a second one.
+    
+    Returns:
+        Id of the run to poll at GET /api/runs/{id}
+    """
+    run, run_id = _begin_run("manual")
+    if run is None:
+        return run_id
+    
+    if scheduler is not None:
+        scheduler.add_job(_execute_run, args=[run], id=f"manual_check_{run.id}")
+    else:
+        threading.Thread(target=_execute_run, args=[run], daemon=True).start()
+    return run_id
 
@@ -10,14 +10,23 @@ load_dotenv()
 
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR / "data"
-
-# Ensure data directory exists
-DATA_DIR.mkdir(exist_ok=True)
+DATA_DIR = BASE_DIR / "data"  # Created on startup by init_db
 
 # Database
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DATA_DIR}/birthday.db")
 
+# SQLite connection tuning (applied to every new connection)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))  # negative = KiB
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))  # bytes
+
+# Connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds
+
 # Email settings
 TO_EMAIL = os.getenv("TO_EMAIL", "")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "")
@@ -28,10 +37,56 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_MODE = os.getenv("SMTP_MODE", "starttls")  # starttls, ssl, plain
+# Socket timeout for connecting and every SMTP command, so a stalled server can't hang a send
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))  # seconds
+
+# SMTP connection pool
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_MAX_CONNECTION_AGE = int(os.getenv("SMTP_MAX_CONNECTION_AGE", "300"))  # seconds
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+
+# SMTP send budget (0 = unlimited), e.g. a provider's per-minute and daily quota
+SMTP_RATE_PER_SECOND = float(os.getenv("SMTP_RATE_PER_SECOND", "0"))
+SMTP_RATE_PER_MINUTE = int(os.getenv("SMTP_RATE_PER_MINUTE", "0"))
+SMTP_RATE_PER_DAY = int(os.getenv("SMTP_RATE_PER_DAY", "0"))
+# Longest a send waits for budget before it is deferred to a later drain
+SMTP_RATE_MAX_WAIT = float(os.getenv("SMTP_RATE_MAX_WAIT", "60"))  # seconds
+# Pause after a 421/450/451 reply, doubled per consecutive one
+SMTP_THROTTLE_BACKOFF = float(os.getenv("SMTP_THROTTLE_BACKOFF", "5"))  # seconds
+SMTP_THROTTLE_BACKOFF_MAX = float(os.getenv("SMTP_THROTTLE_BACKOFF_MAX", "300"))  # seconds
+
+# Number of reminders sent in parallel by the daily job
+SEND_CONCURRENCY = int(os.getenv("SEND_CONCURRENCY", "4"))
+
+# Outbox: due reminders are queued, then sent and retried by a drain worker
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", "60"))  # seconds, doubled per attempt
+OUTBOX_RETRY_MAX = float(os.getenv("OUTBOX_RETRY_MAX", "3600"))  # seconds
+OUTBOX_POLL_SECONDS = int(os.getenv("OUTBOX_POLL_SECONDS", "30"))
+
+# Digest mode: send one email per run listing all reminders
+DIGEST_MODE = os.getenv("DIGEST_MODE", "false").lower() in ("1", "true", "yes")
 
 # Schedule settings
 TIMEZONE = os.getenv("TIMEZONE", "Asia/Shanghai")
 DAILY_RUN_AT = os.getenv("DAILY_RUN_AT", "09:00")
+# Day Feb 29 birthdays are observed in non-leap years: feb28 or mar1
+FEB29_RULE = os.getenv("FEB29_RULE", "feb28").lower()
+# Days of missed runs (e.g. downtime) caught up on the next run (0 disables)
+CATCHUP_MAX_DAYS = int(os.getenv("CATCHUP_MAX_DAYS", "31"))
+
+# Leader lease: with several workers only the lease holder runs scheduled jobs
+LEADER_LEASE_SECONDS = int(os.getenv("LEADER_LEASE_SECONDS", "30"))
+LEADER_RENEW_SECONDS = int(os.getenv("LEADER_RENEW_SECONDS", "10"))
+
+# Log retention (0 disables the rule, the default); pruned nightly at 03:30
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "0"))
+LOG_MAX_ROWS = int(os.getenv("LOG_MAX_ROWS", "0"))
+LOG_PRUNE_BATCH_SIZE = int(os.getenv("LOG_PRUNE_BATCH_SIZE", "1000"))
+
+# Rendered HTML pages kept in memory per data version (0 disables)
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "64"))
 
 # Optional
 BASE_URL = os.getenv("BASE_URL", "")
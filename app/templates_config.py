@@ -3,6 +3,7 @@ Shared templates configuration for all routes.
 """
 from pathlib import Path
 from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 
 from app import settings
 
@@ -23,3 +24,13 @@ def url_for_with_root(path: str) -> str:
 templates.env.globals["url_for_path"] = url_for_with_root
 templates.env.globals["root_path"] = settings.ROOT_PATH
 
+
+# Email templates: dedicated environment, compiled once (auto_reload off so
+# rendering never stats the template files). HTML is autoescaped, .txt is not.
+email_templates = Environment(
+    loader=FileSystemLoader(str(TEMPLATES_DIR / "emails")),
+    autoescape=select_autoescape(["html"], default=False),
+    auto_reload=False,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
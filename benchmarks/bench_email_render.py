@@ -0,0 +1,131 @@
+"""
+Micro-benchmark: reminder email rendering, f-string vs precompiled Jinja2.
+
+Usage:
+    python -m benchmarks.bench_email_render [--renders 10000]
+"""
+import argparse
+import json
+import time
+from datetime import date
+from types import SimpleNamespace
+
+from app.emailer import create_reminder_email
+
+
+def legacy_create_reminder_email(
+    contact,
+    reminder_type: str,
+    target_date: date,
+) -> tuple[str, str]:
+    """
+    Pre-template implementation (f-string), kept for comparison.
+    
+    Args:
+        contact: The contact whose birthday is coming up
+        reminder_type: 'week', 'day', or 'today'
+        target_date: The actual birthday date this year
+    
+    Returns:
+        Tuple of (subject, html_body)
+    """
+    type_labels = {
+        "week": "一周后",
+        "day": "明天",
+        "today": "今天",
+    }
+    
+    type_emoji = {
+        "week": "📅",
+        "day": "⏰",
+        "today": "🎂",
+    }
+    
+    label = type_labels.get(reminder_type, reminder_type)
+    emoji = type_emoji.get(reminder_type, "🔔")
+    
+    # Calculate age if birth year is reasonable
+    age_text = ""
+    if contact.birthday.year > 1900:
+        age = target_date.year - contact.birthday.year
+        age_text = f"（{age}岁）"
+    
+    subject = f"{emoji} {contact.name} 的生日{label}！"
+    
+    html_body = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+    </head>
+    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 500px; margin: 0 auto; padding: 20px; background: #f5f5f5;">
+        <div style="background: white; border-radius: 12px; padding: 30px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
+            <div style="text-align: center; font-size: 48px; margin-bottom: 20px;">{emoji}</div>
+            
+            <h1 style="text-align: center; color: #333; margin: 0 0 10px 0; font-size: 24px;">
+                {contact.name} 的生日{label}！
+            </h1>
+            
+            <p style="text-align: center; color: #666; margin: 0 0 30px 0;">
+                {target_date.strftime('%Y年%m月%d日')} {age_text}
+            </p>
+            
+            <div style="background: #f8f9fa; border-radius: 8px; padding: 20px; margin-bottom: 20px;">
+                <table style="width: 100%; border-collapse: collapse;">
+                    <tr>
+                        <td style="color: #888; padding: 5px 0;">姓名</td>
+                        <td style="text-align: right; font-weight: 500;">{contact.name}</td>
+                    </tr>
+                    <tr>
+                        <td style="color: #888; padding: 5px 0;">生日</td>
+                        <td style="text-align: right;">{contact.birthday.strftime('%m月%d日')}</td>
+                    </tr>
+                    {"<tr><td style='color: #888; padding: 5px 0;'>备注</td><td style='text-align: right;'>" + contact.note + "</td></tr>" if contact.note else ""}
+                </table>
+            </div>
+            
+            <p style="text-align: center; color: #888; font-size: 14px; margin: 0;">
+                记得送上你的祝福哦 💝
+            </p>
+        </div>
+        
+        <p style="text-align: center; color: #aaa; font-size: 12px; margin-top: 20px;">
+            Birthday Notify Bird 🐦
+        </p>
+    </body>
+    </html>
+    """
+    
+    return subject, html_body
+
+
+def bench(func, contact, renders: int) -> float:
+    """Return the mean render time per message in microseconds."""
+    target = date(date.today().year, contact.birthday.month, contact.birthday.day)
+    start = time.perf_counter()
+    for i in range(renders):
+        func(contact, ("today", "day", "week")[i % 3], target)
+    return (time.perf_counter() - start) / renders * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--renders", type=int, default=10_000)
+    args = parser.parse_args()
+    
+    contact = SimpleNamespace(
+        name="张小明",
+        birthday=date(1990, 5, 20),
+        note="喜欢咖啡 & 猫",
+    )
+    
+    results = {
+        "renders": args.renders,
+        "fstring_us_per_message": round(bench(legacy_create_reminder_email, contact, args.renders), 2),
+        "jinja2_us_per_message": round(bench(create_reminder_email, contact, args.renders), 2),
+    }
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark suite: reminder job, birthday calendar, list pages and email rendering at scale.
+
+Each size runs in a fresh worker process with its own temporary SQLite
+database seeded with N synthetic contacts and N email logs, and an
+in-process SMTP sink standing in for the mail server.
+
+Usage:
+    python -m benchmarks.bench_hot_paths [--sizes 1000,10000,100000,1000000]
+                                         [--repeat 20] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def summarize(samples: list[float]) -> dict:
+    """Reduce timings in seconds to milliseconds statistics."""
+    samples = sorted(samples)
+    return {
+        "min_ms": round(samples[0] * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        "runs": len(samples),
+    }
+
+
+def time_get(client, url: str, repeat: int) -> dict:
+    """Time repeated GET requests, failing loudly on a non-200 answer."""
+    client.get(url)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        samples.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+    return summarize(samples)
+
+
+def run_worker(size: int, repeat: int, renders: int, seed: int, smtp_latency: float) -> dict:
+    """Seed a fresh database, run every benchmark once and return the results."""
+    from benchmarks.smtp_sink import SMTPSink
+
+    with tempfile.TemporaryDirectory(prefix="birthday-bench-") as workdir, \
+            SMTPSink(latency=smtp_latency) as sink:
+        # Settings are read at import time, so configure before importing app
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+            "SMTP_HOST": sink.host,
+            "SMTP_PORT": str(sink.port),
+            "SMTP_MODE": "plain",
+            "SMTP_USERNAME": "bench",
+            "SMTP_PASSWORD": "bench",
+            "FROM_EMAIL": "bench@example.com",
+            "TO_EMAIL": "bench@example.com",
+            "PAGE_CACHE_SIZE": "0",
+        })
+        import pytz
+        from fastapi.testclient import TestClient
+
+        from app import settings
+        from app.birthday_calendar import BirthdayCalendar
+        from app.db import SessionLocal, engine, init_db
+        from app.emailer import create_reminder_email
+        from app.main import app
+        from app.models import Contact, birthday_key
+        from app.scheduler import CheckRun, check_and_send_reminders
+        from benchmarks.synthetic import seed_database
+
+        today = datetime.now(pytz.timezone(settings.TIMEZONE)).date()
+        results = {"size": size, "contacts": size, "email_logs": size}
+
+        init_db()
+        start = time.perf_counter()
+        seed_database(engine, contacts=size, logs=size, today=today, seed=seed)
+        results["seed_seconds"] = round(time.perf_counter() - start, 3)
+
+        # Birthday calendar: a full build, then the 30-day window of the home page
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            calendar = BirthdayCalendar().sync(db)
+            results["calendar_build_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            calendar.window(today, 30)
+            samples.append(time.perf_counter() - start)
+        results["calendar_window_30d"] = summarize(samples)
+
+        # Reminder job: first run sends everything due, second finds it all logged
+        for label in ("check_cold", "check_warm"):
+            run = CheckRun("benchmark")
+            messages_before = sink.messages
+            start = time.perf_counter()
+            check_and_send_reminders(run)
+            elapsed = time.perf_counter() - start
+            if run.status != "done":
+                raise RuntimeError(f"{label} failed: {run.error}")
+            results[label] = {
+                "ms": round(elapsed * 1000, 3),
+                "scanned": run.scanned,
+                "sent": run.sent,
+                "failed": run.failed,
+                "skipped": run.skipped,
+                "smtp_messages": sink.messages - messages_before,
+            }
+
+        # List pages: first page plus a deep keyset page half a year ahead
+        client = TestClient(app)  # no lifespan: the scheduler stays off
+        deep_md = birthday_key(today + timedelta(days=182))
+        segment = 0 if deep_md >= birthday_key(today) else 1
+        oldest_log = today - timedelta(days=182)
+        results["index"] = time_get(client, "/", repeat)
+        results["list_contacts"] = time_get(client, "/contacts", repeat)
+        results["list_contacts_deep"] = time_get(client, f"/contacts?after={segment},{deep_md},0", repeat)
+        results["search_contacts"] = time_get(client, "/contacts?q=王", repeat)
+        results["list_logs"] = time_get(client, "/logs", repeat)
+        results["list_logs_deep"] = time_get(client, f"/logs?before={oldest_log.isoformat()}T00:00:00,0", repeat)
+
+        # Email rendering, using the leap-day contact
+        with engine.connect() as connection:
+            contact = connection.execute(
+                Contact.__table__.select().where(Contact.id == 1)
+            ).one()
+        start = time.perf_counter()
+        for _ in range(renders):
+            create_reminder_email(contact, "today", today)
+        results["create_reminder_email_us"] = round(
+            (time.perf_counter() - start) / renders * 1_000_000, 2
+        )
+        engine.dispose()
+    return results
+
+
+def environment() -> dict:
+    """Describe the machine and code version the results came from."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--repeat", type=int, default=20, help="requests per page benchmark")
+    parser.add_argument("--renders", type=int, default=2000, help="emails rendered")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="sink delay per message (s)")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        # Worker: single size, results on the last stdout line
+        result = run_worker(args.worker, args.repeat, args.renders, args.seed, args.smtp_latency)
+        print("\n" + json.dumps(result, ensure_ascii=False))
+        return
+
+    report = {
+        "environment": environment(),
+        "parameters": {
+            "repeat": args.repeat,
+            "renders": args.renders,
+            "seed": args.seed,
+            "smtp_latency": args.smtp_latency,
+        },
+        "results": [],
+    }
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        print(f"⏱️  Benchmarking {size} contacts...", file=sys.stderr)
+        completed = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.bench_hot_paths",
+                "--worker", str(size),
+                "--repeat", str(args.repeat),
+                "--renders", str(args.renders),
+                "--seed", str(args.seed),
+                "--smtp-latency", str(args.smtp_latency),
+            ],
+            cwd=PROJECT_DIR, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            sys.stderr.write(completed.stderr)
+            raise SystemExit(f"Benchmark for {size} contacts failed")
+        report["results"].append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+        print(f"✅ Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
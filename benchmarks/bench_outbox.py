@@ -0,0 +1,169 @@
+"""
+Benchmark: outbox drain throughput and retry behaviour.
+
+Seeds a temporary database with contacts whose birthday is today, spread
+over several recipients, runs the daily check against an SMTP sink that
+refuses a share of messages, and keeps draining until the outbox is empty.
+Retry delays and the throttling pause are scaled down via --retry-base so
+the whole backoff sequence plays out in seconds.
+
+The default reply, 452, is a plain temporary failure; 451 also makes the
+rate limiter pause, and a 5xx code is a permanent failure that is not
+retried. --rate-per-second caps sends like a provider quota would.
+
+Usage:
+    python -m benchmarks.bench_outbox [--reminders 2000] [--recipients 8]
+                                      [--fail-rate 0.2] [--fail-code 452]
+                                      [--max-attempts 5] [--rate-per-second 0]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+from benchmarks.bench_hot_paths import environment
+
+
+def run(args) -> dict:
+    """Queue and drain every reminder, returning timings and outcome counts."""
+    from benchmarks.smtp_sink import SMTPSink
+
+    with tempfile.TemporaryDirectory(prefix="birthday-bench-") as workdir, \
+            SMTPSink(
+                latency=args.smtp_latency, fail_rate=args.fail_rate, fail_code=args.fail_code, seed=args.seed,
+            ) as sink:
+        # Settings are read at import time, so configure before importing app
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+            "SMTP_HOST": sink.host,
+            "SMTP_PORT": str(sink.port),
+            "SMTP_MODE": "plain",
+            "SMTP_USERNAME": "bench",
+            "SMTP_PASSWORD": "bench",
+            "FROM_EMAIL": "bench@example.com",
+            "TO_EMAIL": "bench@example.com",
+            "SEND_CONCURRENCY": str(args.concurrency),
+            "SMTP_POOL_SIZE": str(args.concurrency),
+            "OUTBOX_BATCH_SIZE": str(args.batch_size),
+            "OUTBOX_MAX_ATTEMPTS": str(args.max_attempts),
+            "OUTBOX_RETRY_BASE": str(args.retry_base),
+            "OUTBOX_RETRY_MAX": str(args.retry_base * 2 ** args.max_attempts),
+            "SMTP_RATE_PER_SECOND": str(args.rate_per_second),
+            "SMTP_THROTTLE_BACKOFF": str(args.retry_base),
+            "SMTP_THROTTLE_BACKOFF_MAX": str(args.retry_base * 8),
+            "CATCHUP_MAX_DAYS": "0",
+        })
+        import pytz
+        from sqlalchemy import func, insert, select
+
+        from app import settings
+        from app.db import SessionLocal, engine, init_db
+        from app.models import Contact, EmailLog, OutboxItem, Recipient, Subscription, birthday_key
+        from app.outbox import drain_outbox
+        from app.scheduler import CheckRun, check_and_send_reminders
+
+        today = datetime.now(pytz.timezone(settings.TIMEZONE)).date()
+        now = datetime.now()
+        init_db()
+        with engine.begin() as connection:
+            connection.execute(insert(Contact), [
+                {
+                    "name": f"联系人{i}",
+                    "birthday": today.replace(year=1990) if (today.month, today.day) != (2, 29) else today,
+                    "birthday_md": birthday_key(today),
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(args.reminders)
+            ])
+            connection.execute(insert(Recipient), [
+                {"email": f"r{i}@example.com", "created_at": now} for i in range(args.recipients)
+            ])
+            connection.execute(insert(Subscription), [
+                {"contact_id": i + 1, "recipient_id": i % args.recipients + 1}
+                for i in range(args.reminders)
+            ])
+
+        # First pass: the scan queues everything and drains it once
+        check_run = CheckRun("benchmark")
+        start = time.perf_counter()
+        check_and_send_reminders(check_run)
+        first_pass = time.perf_counter() - start
+        if check_run.status != "done":
+            raise RuntimeError(f"check failed: {check_run.error}")
+        first_pass_sent = sink.messages
+
+        # Retries: drain until nothing is left queued
+        rounds = 0
+        start = time.perf_counter()
+        while True:
+            with SessionLocal() as db:
+                pending = db.execute(select(func.count()).select_from(OutboxItem)).scalar()
+            if not pending:
+                break
+            drain_outbox(today)
+            rounds += 1
+            time.sleep(args.retry_base / 4)
+        retry_phase = time.perf_counter() - start
+
+        with SessionLocal() as db:
+            statuses = dict(db.execute(
+                select(EmailLog.status, func.count()).group_by(EmailLog.status)
+            ).all())
+            attempts = Counter(
+                int(error.rsplit("已尝试 ", 1)[1].split(" ", 1)[0])
+                for error in db.execute(
+                    select(EmailLog.error).where(EmailLog.status == "failed")
+                ).scalars()
+            )
+        engine.dispose()
+
+    return {
+        "reminders": args.reminders,
+        "queued": check_run.queued,
+        "first_pass": {
+            "seconds": round(first_pass, 3),
+            "sent": first_pass_sent,
+            "messages_per_second": round(first_pass_sent / first_pass, 1) if first_pass else None,
+        },
+        "retry_phase": {"seconds": round(retry_phase, 3), "drain_rounds": rounds},
+        "smtp": {"accepted": sink.messages, "refused": sink.refused, "connections": sink.connections},
+        "email_log": statuses,
+        "failed_after_attempts": dict(attempts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reminders", type=int, default=2000, help="contacts due today")
+    parser.add_argument("--recipients", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4, help="SEND_CONCURRENCY and pool size")
+    parser.add_argument("--batch-size", type=int, default=100, help="OUTBOX_BATCH_SIZE")
+    parser.add_argument("--fail-rate", type=float, default=0.2, help="share of messages refused")
+    parser.add_argument("--fail-code", type=int, default=452, help="reply code for refused messages")
+    parser.add_argument("--max-attempts", type=int, default=5, help="OUTBOX_MAX_ATTEMPTS")
+    parser.add_argument("--retry-base", type=float, default=0.05, help="OUTBOX_RETRY_BASE and throttle pause (s)")
+    parser.add_argument("--rate-per-second", type=float, default=0, help="SMTP_RATE_PER_SECOND (0 = unlimited)")
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="sink delay per message (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = {
+        "environment": environment(),
+        "parameters": vars(args),
+        "results": run(args),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    failed = report["results"]["email_log"].get("failed", 0)
+    attempts = args.max_attempts if args.fail_code < 500 else 1
+    expected = round(args.reminders * args.fail_rate ** attempts, 1)
+    print(f"ℹ️  {failed} reminder(s) failed after all attempts (expected about {expected})",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark: time from process start to the first /health response.
+
+Each sample launches `uvicorn app.main:app` in a new process, as a
+container start would, and polls /health until it answers 200. Scenarios:
+
+- empty: a new database, so the schema is created
+- existing: a database already at the latest schema version, seeded with
+  N contacts and N email logs
+- no_bytecode: as existing, but with an empty bytecode cache, like a
+  container image built without precompiled .pyc files
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 10] [--size 100000] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from benchmarks.bench_hot_paths import PROJECT_DIR, environment, summarize
+
+SCENARIOS = ("empty", "existing", "no_bytecode")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(database: Path, size: int):
+    """Create and fill the benchmark database in a separate process."""
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--seed-worker", str(database), "--size", str(size)],
+        cwd=PROJECT_DIR, check=True, stdout=subprocess.DEVNULL,
+    )
+
+
+def seed_worker(database: str, size: int):
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    from datetime import date
+
+    from app.db import engine, init_db
+    from benchmarks.synthetic import seed_database
+
+    init_db()
+    seed_database(engine, contacts=size, logs=size, today=date.today())
+    engine.dispose()
+
+
+def time_to_health(database: Path, pycache: Path, timeout: float) -> float:
+    """Start the app and return the seconds until /health first answers 200."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{database}",
+        # Keep the benchmark quiet and self-contained
+        SMTP_USERNAME="", SMTP_PASSWORD="", TO_EMAIL="",
+    )
+    # Bytecode goes to the scenario's cache directory, whatever the caller's setting
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPYCACHEPREFIX"] = str(pycache)
+    url = f"http://127.0.0.1:{port}/health"
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with code {process.returncode}")
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f"no /health response within {timeout}s")
+            time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10, help="starts per scenario")
+    parser.add_argument("--size", type=int, default=100_000, help="contacts and logs in the existing database")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for one start")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--seed-worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed_worker:
+        seed_worker(args.seed_worker, args.size)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="birthday-bench-") as workdir:
+        workdir = Path(workdir)
+        existing = workdir / "existing.db"
+        print(f"⏱️  Seeding {args.size} contacts...", file=sys.stderr)
+        seed(existing, args.size)
+        # Shared cache for the warm scenarios, filled by one untimed start
+        warm_cache = workdir / "pycache"
+        time_to_health(existing, warm_cache, args.timeout)
+
+        for scenario in SCENARIOS:
+            print(f"⏱️  {scenario}: {args.runs} start(s)...", file=sys.stderr)
+            samples = []
+            for i in range(args.runs):
+                if scenario == "empty":
+                    database, pycache = workdir / f"empty-{i}.db", warm_cache
+                elif scenario == "existing":
+                    database, pycache = existing, warm_cache
+                else:
+                    database, pycache = existing, workdir / f"pycache-{i}"
+                samples.append(time_to_health(database, pycache, args.timeout))
+            results[scenario] = summarize(samples)
+
+    report = {
+        "environment": environment(),
+        "parameters": {"runs": args.runs, "size": args.size},
+        "results": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+        print(f"✅ Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
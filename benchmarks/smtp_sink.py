@@ -0,0 +1,93 @@
+"""
+In-process SMTP sink for benchmarks.
+
+Speaks just enough ESMTP (EHLO, AUTH, MAIL, RCPT, DATA, NOOP, QUIT) for
+smtplib in "plain" mode, accepts every message and throws it away, so the
+reminder job can be timed end-to-end without a real mail server. A share of
+messages can be refused with an error reply to exercise retries and
+throttling.
+"""
+import random
+import socketserver
+import threading
+import time
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+        self._reply("220 benchmark sink ready")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+
+            if command.startswith(("EHLO", "HELO")):
+                self.wfile.write(b"250-sink\r\n250-AUTH PLAIN LOGIN\r\n250 OK\r\n")
+            elif command.startswith("AUTH"):
+                self._reply("235 authenticated")
+            elif command.startswith("DATA"):
+                self._reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                if sink.latency:
+                    time.sleep(sink.latency)
+                with sink.lock:
+                    refused = sink.fail_rate and sink.rng.random() < sink.fail_rate
+                    if refused:
+                        sink.refused += 1
+                    else:
+                        sink.messages += 1
+                self._reply(f"{sink.fail_code} refused by benchmark sink" if refused else "250 queued")
+            elif command.startswith("QUIT"):
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Threaded SMTP server on 127.0.0.1 that discards what it receives.
+
+    Usage:
+        with SMTPSink(latency=0.005) as sink:
+            ...  # point SMTP_HOST/SMTP_PORT at sink.host/sink.port
+            print(sink.messages)
+
+    Args:
+        latency: Seconds to wait before acknowledging each message
+        fail_rate: Share of messages refused
+        fail_code: Reply code for refused messages (451 is a throttling reply)
+        seed: Seed for picking the refused messages
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0, fail_code: int = 451, seed: int = 0):
+        super().__init__(("127.0.0.1", 0), _SinkHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_code = fail_code
+        self.rng = random.Random(seed)
+        self.connections = 0
+        self.messages = 0
+        self.refused = 0
+        self.lock = threading.Lock()
+        self.host, self.port = self.server_address[:2]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,112 @@
+"""
+Deterministic synthetic data for benchmarks.
+
+Birthdays follow approximate monthly birth shares (late summer peak,
+February trough), birth years are spread over 1950-2015 so Feb 29 turns up
+naturally in leap years, and a slice of contacts has no known birth year
+(stored as 1900). Email logs cover the past year without colliding with the
+(contact_id, reminder_type, send_date) unique index.
+"""
+import calendar
+import random
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Iterator
+
+from sqlalchemy import insert
+
+from app.models import Contact, EmailLog, birthday_key
+
+# Approximate share of births per month (Jan..Dec)
+MONTH_WEIGHTS = (8.1, 7.6, 8.3, 8.0, 8.4, 8.3, 8.9, 9.1, 8.8, 8.6, 8.1, 8.4)
+
+# Fraction of contacts whose birth year is unknown
+YEARLESS_SHARE = 0.1
+
+REMINDER_TYPES = ("today", "day", "week")
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+GIVEN_NAMES = ("伟", "芳", "娜", "敏", "静", "磊", "洋", "艳", "勇", "军", "杰", "娟", "涛", "明", "超", "秀英")
+
+
+def random_birthday(rng: random.Random) -> date:
+    """Draw one birthday from the synthetic distribution."""
+    year = rng.randint(1950, 2015)
+    month = rng.choices(range(1, 13), weights=MONTH_WEIGHTS)[0]
+    day = rng.randint(1, calendar.monthrange(year, month)[1])
+    if rng.random() < YEARLESS_SHARE and (month, day) != (2, 29):
+        year = 1900
+    return date(year, month, day)
+
+
+def contact_rows(count: int, seed: int = 0) -> Iterator[dict]:
+    """
+    Yield insertable contacts rows.
+
+    The first row is always a Feb 29 birthday so leap-day handling is
+    exercised even for small sizes.
+    """
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1)
+    for i in range(count):
+        birthday = date(2000, 2, 29) if i == 0 else random_birthday(rng)
+        name = rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES)
+        yield {
+            "name": f"{name}{i}",
+            "birthday": birthday,
+            "birthday_md": birthday_key(birthday),
+            "note": "同事" if rng.random() < 0.2 else None,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+def log_rows(count: int, contact_count: int, today: date, seed: int = 0) -> Iterator[dict]:
+    """
+    Yield insertable email_log rows, all dated before today.
+
+    Row i belongs to contact (i % contact_count) + 1; its position in that
+    contact's sequence picks the reminder type and year, and the contact id
+    picks the day, so no two rows share (contact_id, reminder_type, send_date).
+    """
+    rng = random.Random(seed + 1)
+    for i in range(count):
+        contact_index, k = i % contact_count, i // contact_count
+        reminder_type = REMINDER_TYPES[k % len(REMINDER_TYPES)]
+        offset = 1 + contact_index % 365 + (k // len(REMINDER_TYPES)) * 365
+        send_date = today - timedelta(days=offset)
+        failed = rng.random() < 0.03
+        yield {
+            "contact_id": contact_index + 1,
+            "reminder_type": reminder_type,
+            "send_date": send_date,
+            "email_to": "bench@example.com",
+            "subject": f"🎂 联系人{contact_index + 1} 的生日提醒",
+            "status": "failed" if failed else "sent",
+            "error": "[临时] SMTP 错误: (451, b'temporary failure')" if failed else None,
+            "created_at": datetime.combine(send_date, datetime.min.time())
+            + timedelta(hours=9, seconds=rng.randint(0, 600)),
+        }
+
+
+def _insert_batches(connection, table, rows: Iterator[dict], batch_size: int):
+    while batch := list(islice(rows, batch_size)):
+        connection.execute(insert(table), batch)
+
+
+def seed_database(engine, contacts: int, logs: int, today: date, seed: int = 0, batch_size: int = 5000):
+    """
+    Fill an initialised (empty) database with synthetic contacts and logs.
+
+    Args:
+        engine: Sync engine bound to the benchmark database
+        contacts: Number of contacts to create (ids 1..contacts)
+        logs: Number of email_log rows to create
+        today: Logs are dated before this day
+        seed: Random seed, so runs with the same arguments are identical
+        batch_size: Rows per executemany call
+    """
+    with engine.begin() as connection:
+        _insert_batches(connection, Contact, contact_rows(contacts, seed), batch_size)
+        if contacts:
+            _insert_batches(connection, EmailLog, log_rows(logs, contacts, today, seed), batch_size)
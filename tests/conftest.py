@@ -0,0 +1,56 @@
+"""
+Shared test setup.
+
+Settings are read when `app` is first imported, so the environment is
+pointed at a throwaway database and a plain-SMTP sink before that happens.
+"""
+import os
+import tempfile
+
+DATA_DIR = tempfile.mkdtemp(prefix="birthday-test-")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{DATA_DIR}/birthday.db",
+    SMTP_HOST="127.0.0.1",
+    SMTP_MODE="plain",
+    SMTP_USERNAME="bird",
+    SMTP_PASSWORD="secret",
+    FROM_EMAIL="bird@example.com",
+    TO_EMAIL="me@example.com",
+)
+
+import pytest
+
+from app import settings
+from app.emailer import smtp_pool
+from benchmarks.smtp_sink import SMTPSink
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Schema of the test database, for tests that don't start the app."""
+    from app.db import init_db
+
+    init_db()
+
+
+@pytest.fixture
+def smtp_sink(monkeypatch):
+    """A running SMTPSink that the app's SMTP settings point at."""
+    with SMTPSink() as sink:
+        monkeypatch.setattr(settings, "SMTP_HOST", sink.host)
+        monkeypatch.setattr(settings, "SMTP_PORT", sink.port)
+        yield sink
+    # Pooled connections would otherwise outlive this sink
+    smtp_pool.close()
+
+
+@pytest.fixture
+def client(smtp_sink):
+    """TestClient running the app's startup and shutdown."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
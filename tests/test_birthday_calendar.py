@@ -0,0 +1,82 @@
+"""BirthdayCalendar patches, rebuilds and Feb 29 placement."""
+from datetime import date
+
+import pytest
+
+from app import settings
+from app.birthday_calendar import VERSION_QUERY, BirthdayCalendar, month_days_on
+from app.db import SessionLocal
+from app.models import Contact
+
+
+@pytest.fixture
+def db(database):
+    with SessionLocal() as db:
+        yield db
+
+
+def add_contact(db, name: str, birthday: date) -> int:
+    contact = Contact(name=name, birthday=birthday)
+    db.add(contact)
+    db.commit()
+    return contact.id
+
+
+def version(db) -> int:
+    return db.execute(VERSION_QUERY).scalar_one()
+
+
+def test_patch_is_ignored_until_built(db):
+    calendar = BirthdayCalendar()
+    calendar.patch(version(db) + 1, 999_999, new_md=1010)
+
+    assert calendar.on(date(2026, 10, 10)) == []
+    assert calendar._version is None
+
+
+def test_patch_applies_next_version_and_ignores_stale_ones(db):
+    calendar = BirthdayCalendar().sync(db)
+    size = calendar.size
+    contact_id = add_contact(db, "补丁", date(1990, 10, 11))
+
+    calendar.patch(version(db), contact_id, new_md=1011)
+    assert contact_id in calendar.on(date(2026, 10, 11))
+    assert calendar.size == size + 1
+
+    # Replaying the same or an older change is a no-op
+    calendar.patch(version(db), contact_id, old_md=1011)
+    calendar.patch(version(db) - 1, contact_id, old_md=1011)
+    assert contact_id in calendar.on(date(2026, 10, 11))
+    assert calendar.size == size + 1
+    assert calendar.sync(db) is calendar and calendar._version == version(db)
+
+
+def test_version_gap_forces_rebuild(db):
+    calendar = BirthdayCalendar().sync(db)
+    # Written by "another process": no patch for this one
+    missed_id = add_contact(db, "别处", date(1990, 10, 12))
+    patched_id = add_contact(db, "本处", date(1990, 10, 13))
+
+    calendar.patch(version(db), patched_id, new_md=1013)
+    assert calendar._version is None
+
+    calendar.sync(db)
+    assert calendar._version == version(db)
+    assert missed_id in calendar.on(date(2026, 10, 12))
+    assert patched_id in calendar.on(date(2026, 10, 13))
+
+
+@pytest.mark.parametrize("rule, observed", [("feb28", date(2027, 2, 28)), ("mar1", date(2027, 3, 1))])
+def test_feb29_birthdays_observed_per_rule(db, monkeypatch, rule, observed):
+    monkeypatch.setattr(settings, "FEB29_RULE", rule)
+    contact_id = add_contact(db, f"闰日{rule}", date(2000, 2, 29))
+    calendar = BirthdayCalendar().sync(db)
+
+    assert 229 in month_days_on(observed)
+    assert contact_id in calendar.on(observed)
+    other = date(2027, 3, 1) if rule == "feb28" else date(2027, 2, 28)
+    assert contact_id not in calendar.on(other)
+    # Leap years keep Feb 29 itself
+    assert month_days_on(date(2028, 2, 29)) == [229]
+    assert contact_id in calendar.on(date(2028, 2, 29))
+    assert contact_id not in calendar.on(date(2028, 2, 28) if rule == "feb28" else date(2028, 3, 1))
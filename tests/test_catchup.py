@@ -0,0 +1,85 @@
+"""Catching up reminders after missed daily runs."""
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+
+from app import scheduler, settings
+from app.db import SessionLocal
+from app.models import Contact, EmailLog, JobState
+
+
+@pytest.fixture
+def run_check(database, smtp_sink, monkeypatch):
+    """Run the daily check on a given day, after a given last completed run."""
+    def run(today: date, last_run_date: date) -> scheduler.CheckRun:
+        monkeypatch.setattr(scheduler, "local_now", lambda: datetime.combine(today, datetime.min.time()))
+        with SessionLocal() as db:
+            state = db.get(JobState, scheduler.DAILY_JOB) or JobState(name=scheduler.DAILY_JOB)
+            state.last_run_date = last_run_date
+            db.add(state)
+            db.commit()
+        check = scheduler.CheckRun("test")
+        scheduler.check_and_send_reminders(check)
+        return check
+
+    return run
+
+
+def add_contacts(birthdays: dict[str, date]):
+    with SessionLocal() as db:
+        db.add_all(Contact(name=name, birthday=birthday) for name, birthday in birthdays.items())
+        db.commit()
+
+
+def subjects(names: list[str]) -> dict[str, str]:
+    with SessionLocal() as db:
+        return dict(db.execute(
+            select(Contact.name, EmailLog.subject)
+            .join(EmailLog, EmailLog.contact_id == Contact.id)
+            .where(Contact.name.in_(names))
+        ).tuples().all())
+
+
+def test_late_reminders_are_worded_by_distance_from_today(run_check, smtp_sink):
+    birthdays = {
+        "两天后": date(1990, 3, 12),   # week reminder was due Mar 5
+        "两天前": date(1990, 3, 8),    # today reminder was due Mar 8
+        "今天": date(1990, 3, 10),
+        "明天": date(1990, 3, 11),
+        "一周后": date(1990, 3, 17),
+    }
+    add_contacts(birthdays)
+
+    check = run_check(date(2026, 3, 10), last_run_date=date(2026, 3, 3))
+
+    assert check.status == "done"
+    assert subjects(list(birthdays)) == {
+        "两天后": "【补发】📅 两天后 的生日2 天后！",
+        "两天前": "【补发】🎂 两天前 的生日2 天前！",
+        "今天": "🎂 今天 的生日今天！",
+        "明天": "⏰ 明天 的生日明天！",
+        "一周后": "📅 一周后 的生日一周后！",
+    }
+    assert smtp_sink.messages == 5
+
+    # Running the same window again sends nothing new
+    again = run_check(date(2026, 3, 10), last_run_date=date(2026, 3, 3))
+
+    assert again.queued == 0
+    assert again.skipped == 5
+    assert smtp_sink.messages == 5
+
+
+def test_catch_up_stops_at_catchup_max_days(run_check, smtp_sink, monkeypatch):
+    monkeypatch.setattr(settings, "CATCHUP_MAX_DAYS", 3)
+    birthdays = {
+        "五天前": date(1990, 4, 5),  # due before the 3-day look-back
+        "三天前": date(1990, 4, 7),
+    }
+    add_contacts(birthdays)
+
+    run_check(date(2026, 4, 10), last_run_date=date(2026, 3, 20))
+
+    assert subjects(list(birthdays)) == {"三天前": "【补发】🎂 三天前 的生日3 天前！"}
+    assert smtp_sink.messages == 1
@@ -0,0 +1,52 @@
+"""Web reads while the scheduler writes: WAL keeps them from locking each other out."""
+import threading
+from datetime import date
+
+from sqlalchemy import select
+
+from app.db import SessionLocal, engine
+from app.models import Contact, EmailLog
+
+
+def test_journal_mode_is_wal(client):
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+
+def test_reads_during_email_log_writes(client):
+    client.post("/contacts/new", data={"name": "并发", "birthday": "1990-05-20"})
+    with SessionLocal() as db:
+        contact_id = db.execute(select(Contact.id).where(Contact.name == "并发")).scalar_one()
+
+    errors = []
+
+    def write_logs():
+        try:
+            for i in range(200):
+                with SessionLocal() as db:
+                    db.add(EmailLog(
+                        contact_id=contact_id,
+                        reminder_type="today",
+                        send_date=date(2026, 5, 20),
+                        email_to=f"reader{i}@example.com",
+                        subject="🎂 并发",
+                    ))
+                    db.commit()
+        except Exception as e:
+            errors.append(e)
+
+    writer = threading.Thread(target=write_logs)
+    writer.start()
+    statuses = []
+    try:
+        while writer.is_alive():
+            try:
+                statuses.append(client.get("/contacts").status_code)
+            except Exception as e:
+                errors.append(e)
+    finally:
+        writer.join()
+
+    assert not [e for e in errors if "database is locked" in str(e)]
+    assert not errors
+    assert statuses and set(statuses) == {200}
@@ -0,0 +1,33 @@
+"""Contact import parsing and name validation."""
+import io
+
+from app.contact_io import iter_rows
+
+
+def parse(text: str, fmt: str):
+    return list(iter_rows(io.BytesIO(text.encode()), fmt))
+
+
+def test_csv_rejects_line_breaks_in_names():
+    rows = parse('name,birthday\n"张\n三",1990-05-20\n王五,1991-06-01\n', "csv")
+
+    assert [error for _, _, error in rows] == ["姓名不能包含换行或控制字符", None]
+    assert rows[1][1]["name"] == "王五"
+
+
+def test_vcard_rejects_escaped_line_breaks_in_names():
+    rows = parse(
+        "BEGIN:VCARD\r\nFN:李\\n四\r\nBDAY:1990-05-20\r\nEND:VCARD\r\n"
+        "BEGIN:VCARD\r\nFN:赵六\r\nBDAY:--05-21\r\nEND:VCARD\r\n",
+        "vcard",
+    )
+
+    assert [error for _, _, error in rows] == ["姓名不能包含换行或控制字符", None]
+    assert rows[1][1]["name"] == "赵六"
+
+
+def test_form_rejects_control_characters_in_names(client):
+    response = client.post("/contacts/new", data={"name": "张\t三", "birthday": "1990-05-20"})
+
+    assert response.status_code == 400
+    assert "姓名不能包含换行或控制字符" in response.text
@@ -0,0 +1,25 @@
+"""send_batch failure isolation, against an SMTPSink."""
+from datetime import date
+
+from app.emailer import PERMANENT_ERROR, create_reminder_email, send_batch
+from app.models import Contact
+
+
+def test_unbuildable_message_fails_alone(smtp_sink):
+    results = send_batch("me@example.com", [
+        ("ok1", "<p>1</p>", "1"),
+        ("bad\nsubject", "<p>2</p>", "2"),
+        ("ok2", "<p>3</p>", "3"),
+    ])
+
+    assert results[0] == (True, "")
+    assert not results[1][0] and results[1][1].startswith(PERMANENT_ERROR)
+    assert results[2] == (True, "")
+    assert smtp_sink.messages == 2
+
+
+def test_reminder_subject_is_one_line():
+    contact = Contact(name="张\n三", birthday=date(1990, 5, 20))
+    subject, _, _ = create_reminder_email(contact, "today", date(2026, 5, 20))
+
+    assert subject == "🎂 张 三 的生日今天！"
@@ -0,0 +1,35 @@
+"""Slow SMTP must not stall other requests: sends run off the event loop."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SMTP_LATENCY = 1.0
+
+
+def test_health_stays_fast_during_test_email(client, smtp_sink):
+    smtp_sink.latency = SMTP_LATENCY
+    result = {}
+    sender = threading.Thread(
+        target=lambda: result.update(client.get("/api/test-email").json())
+    )
+    sender.start()
+    # Wait until the message is with the server
+    deadline = time.monotonic() + SMTP_LATENCY
+    while smtp_sink.connections == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    def timed_health(_):
+        started = time.perf_counter()
+        response = client.get("/health")
+        return response.status_code, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        timings = list(pool.map(timed_health, range(8)))
+    in_flight = sender.is_alive()
+    sender.join()
+
+    assert in_flight
+    assert {status for status, _ in timings} == {200}
+    assert max(elapsed for _, elapsed in timings) < SMTP_LATENCY / 4
+    assert result["status"] == "success"
+    assert smtp_sink.messages == 1
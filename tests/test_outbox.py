@@ -0,0 +1,118 @@
+"""Outbox retries, backoff and dead-lettering, against a refusing SMTPSink."""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app import settings
+from app.db import SessionLocal
+from app.emailer import PERMANENT_ERROR, TEMPORARY_ERROR
+from app.models import Contact, EmailLog, OutboxItem
+from app.outbox import drain_outbox, enqueue
+
+TODAY = date(2026, 8, 1)
+
+
+@pytest.fixture
+def queue(database, monkeypatch):
+    """Queue one reminder for a new contact and recipient; returns the recipient."""
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_BASE", 60)
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_MAX", 3600)
+
+    def queue(email_to: str) -> str:
+        with SessionLocal() as db:
+            contact = Contact(name=email_to, birthday=date(1990, 8, 1))
+            db.add(contact)
+            db.flush()
+            enqueue(db, [{
+                "contact_id": contact.id,
+                "reminder_type": "today",
+                "send_date": TODAY,
+                "target_date": TODAY,
+                "email_to": email_to,
+            }])
+            db.commit()
+        return email_to
+
+    return queue
+
+
+def outbox_item(email_to: str) -> OutboxItem | None:
+    with SessionLocal() as db:
+        return db.execute(select(OutboxItem).where(OutboxItem.email_to == email_to)).scalar()
+
+
+def email_log(email_to: str) -> EmailLog | None:
+    with SessionLocal() as db:
+        return db.execute(select(EmailLog).where(EmailLog.email_to == email_to)).scalar()
+
+
+def make_due(email_to: str):
+    with SessionLocal() as db:
+        db.execute(
+            update(OutboxItem)
+            .where(OutboxItem.email_to == email_to)
+            .values(next_attempt_at=datetime.now() - timedelta(seconds=1))
+        )
+        db.commit()
+
+
+def test_temporary_failures_back_off_then_dead_letter(queue, smtp_sink):
+    smtp_sink.fail_rate, smtp_sink.fail_code = 1.0, 452
+    email_to = queue("retry@example.com")
+
+    for attempts, max_delay in ((1, 60), (2, 120)):
+        started = datetime.now()
+        assert drain_outbox(TODAY) == 0
+
+        item = outbox_item(email_to)
+        assert item.status == "pending"
+        assert item.attempts == attempts
+        assert item.last_error.startswith(TEMPORARY_ERROR)
+        # Half of the delay is jitter
+        delay = (item.next_attempt_at - started).total_seconds()
+        assert max_delay / 2 <= delay <= max_delay + 1
+        assert email_log(email_to) is None
+
+        # Not due yet: another drain leaves it alone
+        drain_outbox(TODAY)
+        assert outbox_item(email_to).attempts == attempts
+        make_due(email_to)
+
+    drain_outbox(TODAY)
+
+    assert outbox_item(email_to) is None
+    log = email_log(email_to)
+    assert log.status == "failed"
+    assert log.error.startswith(TEMPORARY_ERROR)
+    assert log.error.endswith("（已尝试 3 次）")
+    assert smtp_sink.refused == 3
+
+
+def test_permanent_failure_is_not_retried(queue, smtp_sink):
+    smtp_sink.fail_rate, smtp_sink.fail_code = 1.0, 550
+    email_to = queue("rejected@example.com")
+
+    drain_outbox(TODAY)
+
+    assert outbox_item(email_to) is None
+    log = email_log(email_to)
+    assert log.status == "failed"
+    assert log.error.startswith(PERMANENT_ERROR)
+    assert log.error.endswith("（已尝试 1 次）")
+    assert smtp_sink.refused == 1
+
+
+def test_retry_succeeds_once_the_server_recovers(queue, smtp_sink):
+    smtp_sink.fail_rate, smtp_sink.fail_code = 1.0, 452
+    email_to = queue("recovers@example.com")
+
+    drain_outbox(TODAY)
+    smtp_sink.fail_rate = 0.0
+    make_due(email_to)
+    assert drain_outbox(TODAY) == 1
+
+    assert outbox_item(email_to) is None
+    assert email_log(email_to).status == "sent"
+    assert (smtp_sink.refused, smtp_sink.messages) == (1, 1)
@@ -0,0 +1,26 @@
+"""Conditional GETs on the HTML pages."""
+import subprocess
+import sys
+from pathlib import Path
+
+from app import page_cache
+
+
+def test_deploy_token_is_shared_by_workers():
+    # A second worker is a separate process importing the same code
+    other = subprocess.run(
+        [sys.executable, "-c", "from app import page_cache; print(page_cache._DEPLOY_TOKEN)"],
+        capture_output=True, text=True, check=True, cwd=Path(__file__).parents[1],
+    )
+
+    assert other.stdout.strip() == page_cache._DEPLOY_TOKEN
+
+
+def test_matching_etag_is_not_modified(client):
+    etag = client.get("/contacts").headers["etag"]
+
+    assert client.get("/contacts", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/contacts/new", data={"name": "新人", "birthday": "1990-07-01"})
+
+    assert client.get("/contacts", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,49 @@
+"""Contact search: trigram index for 3+ characters, name grams for shorter terms."""
+from datetime import date
+
+import pytest
+
+from app.db import SessionLocal
+from app.models import Contact
+
+
+NAMES = ("欧阳娜娜", "欧阳锋", "Ana Lee")
+
+
+@pytest.fixture(scope="module")
+def contacts(database):
+    with SessionLocal() as db:
+        for name, note in zip(NAMES, ("大学同学", None, "同事")):
+            db.add(Contact(name=name, birthday=date(1990, 9, 1), note=note))
+        db.commit()
+
+
+def names(client, q: str) -> set[str]:
+    """Names listed for a search (the search box above the list echoes q)."""
+    results = client.get("/contacts", params={"q": q}).text.split("</form>", 1)[1]
+    return {name for name in NAMES if name in results}
+
+
+@pytest.mark.parametrize("q, expected", [
+    ("欧", {"欧阳娜娜", "欧阳锋"}),     # first character
+    ("阳锋", {"欧阳锋"}),               # inside the name
+    ("娜", {"欧阳娜娜"}),
+    ("欧 娜", {"欧阳娜娜"}),            # every term must match
+    ("AN", {"Ana Lee"}),               # ASCII is case-insensitive
+    ("欧阳 大学同学", {"欧阳娜娜"}),     # short name term, filtered by a long term
+    ("大学同学", {"欧阳娜娜"}),          # long terms also search notes
+    ("同事", set()),                   # short terms search names only
+    ("欧阳锋 x", set()),
+])
+def test_search_terms(contacts, client, q, expected):
+    assert names(client, q) == expected
+
+
+def test_renamed_contact_is_found_by_new_name(contacts, client):
+    with SessionLocal() as db:
+        contact = db.query(Contact).filter_by(name="欧阳锋").one()
+        contact.name = "黄药师"
+        db.commit()
+
+    assert names(client, "阳锋") == set()
+    assert "黄药师" in client.get("/contacts", params={"q": "药"}).text.split("</form>", 1)[1]
@@ -0,0 +1,64 @@
+"""SMTPPool connection reuse, retirement, reconnects and timeouts, against an SMTPSink."""
+import smtplib
+import socket
+import time
+
+import pytest
+
+from app import settings
+from app.emailer import SMTPPool
+
+MESSAGE = "Subject: test\r\n\r\nhello\r\n"
+
+
+def send(pool: SMTPPool, count: int):
+    for _ in range(count):
+        pool.sendmail("bird@example.com", ["me@example.com"], MESSAGE)
+
+
+def test_reuses_one_connection_across_sends(smtp_sink):
+    pool = SMTPPool(max_size=1, max_age=300, max_messages=100)
+    send(pool, 5)
+    pool.close()
+
+    assert smtp_sink.messages == 5
+    assert smtp_sink.connections == 1
+
+
+def test_retires_connection_after_max_messages(smtp_sink):
+    pool = SMTPPool(max_size=1, max_age=300, max_messages=2)
+    send(pool, 5)
+    pool.close()
+
+    assert smtp_sink.messages == 5
+    assert smtp_sink.connections == 3
+
+
+def test_reconnects_after_server_disconnect(smtp_sink):
+    pool = SMTPPool(max_size=1, max_age=300, max_messages=100)
+    send(pool, 1)
+
+    # Drop the idle connection as a restarting server would
+    with pool.connection() as conn:
+        conn.server.sock.shutdown(socket.SHUT_RDWR)
+
+    send(pool, 1)
+    pool.close()
+
+    assert smtp_sink.messages == 2
+    assert smtp_sink.connections == 2
+
+
+def test_times_out_on_stalled_server(monkeypatch):
+    # Accepts the connection but never sends a greeting
+    with socket.create_server(("127.0.0.1", 0)) as stalled:
+        monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+        monkeypatch.setattr(settings, "SMTP_PORT", stalled.getsockname()[1])
+        monkeypatch.setattr(settings, "SMTP_TIMEOUT", 0.2)
+        pool = SMTPPool(max_size=1, max_age=300, max_messages=100)
+
+        started = time.monotonic()
+        with pytest.raises(smtplib.SMTPServerDisconnected, match="timed out"):
+            send(pool, 1)
+
+    assert time.monotonic() - started < 2